@@ -0,0 +1,91 @@
+from datetime import timedelta
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_safe
+from .conditional import ledger_cache, ledger_etag, ledger_last_modified
+from .fields import from_cents
+from .models import month_bounds
+from .pagination import SORT_KEYS, keyset_page
+from .views import find_queryset, month_year
+from . import summaries, timeline
+
+PAGE_SIZE = 50
+LIST_FIELDS = ("id", "name", "purpose", "amount", "due_date", "repeat_pattern")
+LIST_TYPES = {"expenses": "Expense", "incomes": "Income", "loans": "Loan"}
+
+
+def month_etag(request, monthyear=None) -> str:
+    """Return the ETag of a month resource of the ledger the user acts on. Raises Http404 if monthyear is not a valid
+    month, before the view runs."""
+    return ledger_etag(request, request.path, *month_year(monthyear))
+
+
+def list_etag(request, kind) -> str:
+    """Return the ETag of one page of a transaction list of the ledger the user acts on."""
+    return ledger_etag(
+        request, kind, request.GET.get("sort", ""), request.GET.get("cursor", "")
+    )
+
+
+@require_safe
+@ledger_cache
+@condition(etag_func=month_etag, last_modified_func=ledger_last_modified)
+def month_api(request, monthyear=None):
+    """Functional view returning the income, expense and net total of a month as JSON."""
+    month, year = month_year(monthyear)
+    summary = summaries.get_month_summary(request.user, month=month, year=year)
+    return JsonResponse(
+        {
+            "month": month,
+            "year": year,
+            "income": summary.income,
+            "expense": summary.expense,
+            "net": summary.net,
+        }
+    )
+
+
+@require_safe
+@ledger_cache
+@condition(etag_func=month_etag, last_modified_func=ledger_last_modified)
+def days_api(request, monthyear=None):
+    """Functional view returning the summed amount of every day of a month as JSON."""
+    month, year = month_year(monthyear)
+    start, end = month_bounds(month, year)
+    deltas = timeline.day_deltas(request.user, start, end)
+    return JsonResponse(
+        {
+            "month": month,
+            "year": year,
+            "days": [
+                {"date": start + timedelta(days=index), "amount": from_cents(amount)}
+                for index, amount in enumerate(deltas)
+            ],
+        }
+    )
+
+
+@require_safe
+@ledger_cache
+@condition(etag_func=list_etag, last_modified_func=ledger_last_modified)
+def transactions_api(request, kind):
+    """Functional view returning one keyset paginated page of the expenses, incomes or loans as JSON. Takes the same
+    sort and cursor query parameters as the list pages, next is the cursor of the following page."""
+    if kind not in LIST_TYPES:
+        raise Http404("Unknown transaction list.")
+    sort = request.GET.get("sort", "due_date")
+    if sort not in SORT_KEYS:
+        sort = "due_date"
+    queryset = find_queryset(request.user).filter(transaction_type=LIST_TYPES[kind])
+    page = keyset_page(
+        queryset.only(*LIST_FIELDS), sort, request.GET.get("cursor"), PAGE_SIZE
+    )
+    return JsonResponse(
+        {
+            "sort": page.sort,
+            "next": page.next_cursor,
+            "results": [
+                {field: getattr(transaction, field) for field in LIST_FIELDS}
+                for transaction in page.items
+            ],
+        }
+    )
@@ -0,0 +1,131 @@
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.generic.base import View
+from .conditional import ledger_last_modified
+from .pagination import keyset_queryset, make_page
+from .views import (
+    BalanceView,
+    KeysetListMixin,
+    balance_etag,
+    find_queryset,
+)
+
+
+class AsyncLedgerView(View):
+    """Base class for async views of the ledger the user acts on. Loads the user off the event loop, redirects anonymous
+    users to the login page and answers with 304 if the client's copy is current (like LoginRequiredMixin and the
+    condition decorator, which only support sync views in this Django version)."""
+
+    template_name = None
+
+    def get_etag(self, request, *args, **kwargs) -> Optional[str]:
+        """Return the ETag of the requested page, None to always build the page. Loads the user as a side effect."""
+        request.user.is_authenticated
+        return None
+
+    def validators(self, request, *args, **kwargs):
+        """Return tuple (etag, last modified timestamp) of the requested page, (None, None) for anonymous users. Loads the
+        user and the ledger owner lazily, so it must not run on the event loop."""
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is None:
+            return None, None
+        modified = ledger_last_modified(request)
+        return quote_etag(etag), int(modified.timestamp()) if modified else None
+
+    async def get(self, request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(self.validators)(
+            request, *args, **kwargs
+        )
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+
+        response = None
+        if etag is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+        if response is None:
+            context = await self.get_context_data(request, *args, **kwargs)
+            # Rendering may be CPU heavy and templates may touch lazy attributes, so it runs off the event loop.
+            response = await sync_to_async(render)(
+                request, self.template_name, context
+            )
+        if etag is not None:
+            response.headers.setdefault("ETag", etag)
+            if last_modified:
+                response.headers.setdefault("Last-Modified", http_date(last_modified))
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    async def get_context_data(self, request, *args, **kwargs):
+        """Collect context data to be displayed in html."""
+        return {}
+
+
+class AsyncBalanceView(AsyncLedgerView):
+    """Async class based view for Balance. The month total and the groups come from the ORM, so they are loaded together
+    in a single call off the event loop; the two queries do not run concurrently."""
+
+    template_name = "balance/balance.html"
+
+    def get_etag(self, request, *args, **kwargs):
+        return balance_etag(request, *args, **kwargs)
+
+    async def get_context_data(self, request, *args, **kwargs):
+        """Collect context data to be displayed in html."""
+        view = BalanceView()
+        view.setup(request, *args, **kwargs)
+        # Computing a missing summary expands repeat patterns with NumPy, so it runs off the event loop.
+        return await sync_to_async(self.month_data)(view)
+
+    def month_data(self, view):
+        """Takes a set up BalanceView as argument and returns its month total, month context and the groups of the
+        requesting user (request.groups) as context data."""
+        context = {"month_amount": view.month_amount(), "groups": view.group_members()}
+        context.update(view.month_context())
+        return context
+
+
+class AsyncTransactionListView(KeysetListMixin, AsyncLedgerView):
+    """Base class for the async transaction list views. Shows one keyset paginated page of the transactions of
+    transaction_type."""
+
+    transaction_type = None
+
+    async def get_context_data(self, request, *args, **kwargs):
+        """Collect context data to be displayed in html."""
+        queryset = keyset_queryset(
+            find_queryset(request.user)
+            .filter(transaction_type=self.transaction_type)
+            .only(*self.list_fields),
+            self.sort,
+            request.GET.get("cursor"),
+        )
+        items = [item async for item in queryset[: self.page_size + 1]]
+        page = make_page(items, self.sort, self.page_size)
+        return {"object_list": page.items, "page": page}
+
+
+class AsyncExpenseListView(AsyncTransactionListView):
+    """Async class based view for List of expenses."""
+
+    template_name = "balance/expenses.html"
+    transaction_type = "Expense"
+
+
+class AsyncIncomeListView(AsyncTransactionListView):
+    """Async class based view for List of Incomes."""
+
+    template_name = "balance/incomes.html"
+    transaction_type = "Income"
+
+
+class AsyncLoanListView(AsyncTransactionListView):
+    """Async class based view for List of Loans."""
+
+    template_name = "balance/loans.html"
+    transaction_type = "Loan"
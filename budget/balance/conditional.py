@@ -0,0 +1,38 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+from django.views.decorators.cache import cache_control
+
+# Clients may keep responses, but have to revalidate them with the ETag before using them.
+ledger_cache = cache_control(private=True, no_cache=True)
+
+
+def ledger_etag(request, *parts) -> Optional[str]:
+    """Takes a request and the parts that identify the requested resource (e.g. month and year) as arguments and
+    returns its ETag, None for anonymous users. It changes whenever the ledger the user acts on changes, is renamed or
+    the user switches ledgers."""
+    if not request.user.is_authenticated:
+        return None
+    owner = request.owner
+    key = ":".join(
+        str(part)
+        for part in (
+            owner._meta.model_name,
+            owner.pk,
+            owner,
+            owner.ledger_version,
+            *parts,
+        )
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def ledger_last_modified(request, *args, **kwargs) -> Optional[datetime]:
+    """Takes a request as argument and returns the last time the ledger the user acts on changed. Also covers switching
+    between ledgers, which is stamped on the user, so If-Modified-Since never matches another ledger's data. Returns None
+    for anonymous users."""
+    if not request.user.is_authenticated:
+        return None
+    stamps = [request.user.ledger_modified, request.owner.ledger_modified]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return max(stamps) if stamps else None
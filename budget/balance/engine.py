@@ -0,0 +1,184 @@
+from typing import Dict, List, NamedTuple, Tuple, Union
+from django.db.models.query import QuerySet
+from .models import WEEKLY_PATTERNS
+from .fields import cents, from_cents
+from decimal import Decimal
+import numpy as np
+
+FIELDS = (
+    "transaction_type",
+    cents("amount"),
+    "due_date",
+    "repeat_pattern",
+    "end_date",
+)
+NO_END = np.datetime64("9999-12-31", "D")
+
+
+class TransactionBatch(NamedTuple):
+    """Column arrays of a transaction queryset. Every array has one entry per transaction, amounts are integer cents.
+    loans holds a tuple (repayment dates, payments) for every loan with an amortization schedule.
+    """
+
+    sign: np.ndarray
+    amount: np.ndarray
+    due_date: np.ndarray
+    end_date: np.ndarray
+    step: np.ndarray
+    monthly: np.ndarray
+    one_off: np.ndarray
+    loans: List[Tuple[np.ndarray, np.ndarray]]
+
+    def __len__(self):
+        return len(self.amount)
+
+
+def load_batch(queryset: QuerySet) -> TransactionBatch:
+    """Takes a transaction queryset as argument and returns its columns as a TransactionBatch with a single query."""
+    rows = list(queryset.values_list(*FIELDS))
+    if rows:
+        types, amounts, due_dates, patterns, end_dates = zip(*rows)
+    else:
+        types = amounts = due_dates = patterns = end_dates = ()
+
+    types = np.array(types, dtype=object)
+    patterns = np.array(patterns, dtype=object)
+    # Loans are added through their repayment schedules instead, so they get a sign of 0.
+    sign = np.where(types == "Expense", -1, np.where(types == "Loan", 0, 1))
+    step = np.array([WEEKLY_PATTERNS.get(p, 0) * 7 for p in patterns], dtype=np.int64)
+
+    loans = []
+    if (types == "Loan").any():
+        for loan in queryset.amortized_loans():
+            schedule = loan.schedule()
+            keep = schedule.dates <= (
+                NO_END if loan.end_date is None else loan.end_date
+            )
+            loans.append((schedule.dates[keep], schedule.payment[keep]))
+
+    return TransactionBatch(
+        sign=sign.astype(np.int64),
+        amount=np.array(amounts, dtype=np.int64),
+        due_date=np.array(due_dates, dtype="datetime64[D]"),
+        end_date=np.array(
+            [NO_END if d is None else d for d in end_dates], dtype="datetime64[D]"
+        ),
+        step=step,
+        monthly=patterns == "monthly",
+        one_off=patterns == "one off",
+        loans=loans,
+    )
+
+
+def month_counts(batch: TransactionBatch, months: np.ndarray) -> np.ndarray:
+    """Takes a TransactionBatch and an array of months (datetime64[M]) as arguments and returns an integer array of shape
+    (transactions, months) holding how often each transaction is due in each month."""
+    months = np.asarray(months, dtype="datetime64[M]")[np.newaxis, :]
+    start = months.astype("datetime64[D]")
+    end = (months + 1).astype("datetime64[D]") - 1
+
+    due = batch.due_date[:, np.newaxis]
+    last = np.minimum(end, batch.end_date[:, np.newaxis])
+
+    # Week based patterns: jump to the first and last occurrence inside the window.
+    step = np.maximum(batch.step, 1)[:, np.newaxis]
+    first_offset = -(-np.maximum((start - due).astype(np.int64), 0) // step) * step
+    last_offset = (last - due).astype(np.int64) // step * step
+    weekly = np.where(
+        last_offset >= first_offset, (last_offset - first_offset) // step + 1, 0
+    )
+
+    # Monthly: one occurrence on the due day, clamped to the length of the month.
+    due_day = (due - due.astype("datetime64[M]").astype("datetime64[D]")).astype(
+        np.int64
+    )
+    month_length = (end - start).astype(np.int64)
+    occurrence = start + np.minimum(due_day, month_length)
+    monthly = (months >= due.astype("datetime64[M]")) & (occurrence <= last)
+
+    one_off = (due >= start) & (due <= last)
+
+    counts = np.where(
+        batch.step[:, np.newaxis] > 0,
+        weekly,
+        np.where(
+            batch.monthly[:, np.newaxis],
+            monthly,
+            np.where(batch.one_off[:, np.newaxis], one_off, 0),
+        ),
+    )
+    return counts.astype(np.int64)
+
+
+def month_amounts(batch: TransactionBatch, months: np.ndarray) -> np.ndarray:
+    """Takes a TransactionBatch and an array of months as arguments and returns the signed amount (in cents) of every
+    transaction in every month as an array of shape (transactions + loans, months). Loans are appended as one row of
+    repayments each."""
+    months = np.asarray(months, dtype="datetime64[M]")
+    amounts = month_counts(batch, months) * (batch.sign * batch.amount)[:, np.newaxis]
+    if not batch.loans:
+        return amounts
+
+    loan_rows = [
+        -(
+            payments[:, np.newaxis]
+            * (dates.astype("datetime64[M]")[:, np.newaxis] == months[np.newaxis, :])
+        ).sum(axis=0)
+        for dates, payments in batch.loans
+    ]
+    return np.vstack([amounts, np.array(loan_rows, dtype=np.int64)])
+
+
+def month_amount(
+    transactions: Union[QuerySet, TransactionBatch], month: int, year: int
+) -> Decimal:
+    """Takes a transaction queryset (or an already loaded TransactionBatch), month and year as arguments and returns
+    the signed total of all transactions for that month/year."""
+    batch = (
+        transactions
+        if isinstance(transactions, TransactionBatch)
+        else load_batch(transactions)
+    )
+    if not len(batch):
+        return from_cents(0)
+    months = np.array([f"{year:04d}-{month:02d}"], dtype="datetime64[M]")
+    return from_cents(month_amounts(batch, months).sum())
+
+
+def project(
+    transactions: Union[QuerySet, TransactionBatch], month: int, year: int, months: int
+) -> List[Dict]:
+    """Takes a transaction queryset (or loaded TransactionBatch), start month/year and a number of months as arguments
+    and returns a list with one dictionary of format {month, income, expense, net} per month, computed in one pass.
+    """
+    batch = (
+        transactions
+        if isinstance(transactions, TransactionBatch)
+        else load_batch(transactions)
+    )
+    month_range = np.datetime64(f"{year:04d}-{month:02d}", "M") + np.arange(months)
+    if len(batch):
+        amounts = month_amounts(batch, month_range)
+        income = np.where(amounts > 0, amounts, 0).sum(axis=0)
+        expense = np.where(amounts < 0, amounts, 0).sum(axis=0)
+    else:
+        income = expense = np.zeros(months, dtype=np.int64)
+
+    return [
+        {
+            "month": first_day.item(),
+            "income": from_cents(income[i]),
+            "expense": from_cents(expense[i]),
+            "net": from_cents(income[i] + expense[i]),
+        }
+        for i, first_day in enumerate(month_range.astype("datetime64[D]"))
+    ]
+
+
+def month_totals(queryset: QuerySet, month: int, year: int) -> Tuple[Decimal, Decimal]:
+    """Takes a transaction queryset, month and year as arguments and returns a tuple (income, expense) for that
+    month/year. One off and monthly transactions are summed in the database, only week based ones and loans are loaded.
+    """
+    sums = queryset.month_sums(month, year)
+    row = project(queryset.week_based() | queryset.amortized_loans(), month, year, 1)[0]
+    return sums["income"] + row["income"], sums["expense"] + row["expense"]
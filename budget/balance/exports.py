@@ -0,0 +1,141 @@
+import csv
+import json
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Sequence
+from django.core.serializers.json import DjangoJSONEncoder
+from user.models import MyUser
+from .models import Transaction, TransactionOccurrence
+from . import occurrences
+
+CHUNK_SIZE = 2000
+# Number of rows joined into one piece of the streamed output.
+ROWS_PER_PIECE = 200
+KINDS = ("transactions", "occurrences")
+FORMATS = ("csv", "json")
+CONTENT_TYPES = {"csv": "text/csv", "json": "application/json"}
+
+TRANSACTION_FIELDS = (
+    "id",
+    "name",
+    "purpose",
+    "transaction_type",
+    "amount",
+    "due_date",
+    "repeat_pattern",
+    "end_date",
+    "website",
+    "email",
+    "telephone",
+    "interest_rate",
+    "term_months",
+    "payment",
+)
+OCCURRENCE_FIELDS = ("date", "transaction_id", "name", "transaction_type", "amount")
+
+
+class Echo:
+    """File-like object that returns what is written to it instead of storing it, so csv.writer can produce lines."""
+
+    def write(self, value):
+        return value
+
+
+def transaction_rows(user: MyUser, start: date, end: date) -> Iterator[Dict]:
+    """Takes a user, start and end date as arguments and yields a dictionary for every transaction of the ledger the
+    user acts on that may be due in between, in chunks straight from the database cursor.
+    """
+    queryset = (
+        Transaction.objects.owned_by(user)
+        .active_between(start, end)
+        .order_by("id")
+        .values_list(*TRANSACTION_FIELDS)
+    )
+    for values in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield dict(zip(TRANSACTION_FIELDS, values))
+
+
+def occurrence_rows(user: MyUser, start: date, end: date) -> Iterator[Dict]:
+    """Takes a user, start and end date as arguments and yields a dictionary for every time a transaction of the ledger
+    the user acts on is due in between, with the signed amount. Ordered by date if the occurrences are materialized,
+    expanded transaction by transaction otherwise."""
+    if occurrences.is_materialized(start, end):
+        queryset = (
+            TransactionOccurrence.objects.owned_by(user)
+            .filter(date__range=(start, end))
+            .order_by("date", "transaction_id")
+            .values_list(
+                "date",
+                "transaction_id",
+                "transaction__name",
+                "transaction__transaction_type",
+                "amount",
+            )
+        )
+        for values in queryset.iterator(chunk_size=CHUNK_SIZE):
+            yield dict(zip(OCCURRENCE_FIELDS, values))
+        return
+
+    queryset = Transaction.objects.owned_by(user).active_between(start, end)
+    for transaction in queryset.order_by("id").iterator(chunk_size=CHUNK_SIZE):
+        for due_date, amount in transaction.dated_amounts(start, end):
+            yield {
+                "date": due_date,
+                "transaction_id": transaction.id,
+                "name": transaction.name,
+                "transaction_type": transaction.transaction_type,
+                "amount": amount,
+            }
+
+
+def rows_of(kind: str, user: MyUser, start: date, end: date) -> Iterator[Dict]:
+    """Takes an export kind (transactions or occurrences), a user, start and end date as arguments and returns the
+    matching row generator."""
+    if kind == "transactions":
+        return transaction_rows(user, start, end)
+    return occurrence_rows(user, start, end)
+
+
+def fields_of(kind: str) -> Sequence[str]:
+    """Takes an export kind as argument and returns the names of its columns."""
+    return TRANSACTION_FIELDS if kind == "transactions" else OCCURRENCE_FIELDS
+
+
+def csv_lines(rows: Iterable[Dict], fields: Sequence[str]) -> Iterator[str]:
+    """Takes rows and column names as arguments and yields the CSV header followed by one line per row."""
+    writer = csv.DictWriter(Echo(), fieldnames=fields)
+    yield writer.writerow(dict(zip(fields, fields)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_lines(rows: Iterable[Dict]) -> Iterator[str]:
+    """Takes rows as argument and yields a JSON array of them piece by piece, one row per line."""
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+def export(
+    kind: str, file_format: str, user: MyUser, start: date, end: date
+) -> Iterator[str]:
+    """Takes an export kind, a format (csv or json), a user, start and end date as arguments and returns a generator of
+    the exported text. Nothing is read from the database before the first piece is requested.
+    """
+    rows = rows_of(kind, user, start, end)
+    if file_format == "json":
+        return pieces(json_lines(rows))
+    return pieces(csv_lines(rows, fields_of(kind)))
+
+
+def pieces(lines: Iterator[str], size: int = ROWS_PER_PIECE) -> Iterator[str]:
+    """Takes a generator of lines and a number of lines as arguments and yields them joined in groups of that size, so
+    the response is not written line by line."""
+    while True:
+        piece = "".join(islice(lines, size))
+        if not piece:
+            return
+        yield piece
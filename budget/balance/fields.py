@@ -0,0 +1,81 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, Union
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.utils.functional import cached_property
+
+CENT = Decimal("0.01")
+# Largest number of cents a CentsField (a BigIntegerField) can store.
+MAX_CENTS = 2**63 - 1
+
+
+def to_cents(value: Union[int, float, str, Decimal]) -> int:
+    """Takes an amount in major units (e.g. 12.34) as argument and returns it as integer minor units (1234)."""
+    return int((Decimal(str(value)) / CENT).to_integral_value(ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Takes an amount in integer minor units (1234) as argument and returns it as a Decimal in major units (12.34)."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def fits_cents(value: Decimal) -> bool:
+    """Takes an amount in major units as argument and returns True if it is finite and its cents fit a CentsField."""
+    return value.is_finite() and abs(value) <= from_cents(MAX_CENTS)
+
+
+def validate_cents(value: Decimal):
+    """Validator of CentsField. Raises ValidationError if the amount is not finite or its cents do not fit the column."""
+    if not fits_cents(value):
+        raise exceptions.ValidationError(
+            "Ensure this amount is between %(min)s and %(max)s.",
+            code="out_of_range",
+            params={"min": -from_cents(MAX_CENTS), "max": from_cents(MAX_CENTS)},
+        )
+
+
+def cents(name: str) -> models.ExpressionWrapper:
+    """Takes the name of a CentsField as argument and returns an expression selecting its raw integer minor units."""
+    return models.ExpressionWrapper(
+        models.F(name), output_field=models.BigIntegerField()
+    )
+
+
+class CentsField(models.BigIntegerField):
+    """Model field for money amounts. Stored as integer minor units (cents), so sums in the database are exact.
+    In Python the value is a Decimal with two decimal places."""
+
+    description = "Money amount stored as integer cents"
+
+    def from_db_value(self, value, expression, connection) -> Optional[Decimal]:
+        if value is None:
+            return value
+        return from_cents(value)
+
+    @cached_property
+    def validators(self):
+        # The integer range validators of BigIntegerField would compare major units, the stored value is in cents.
+        return [*self._validators, validate_cents]
+
+    def to_python(self, value) -> Optional[Decimal]:
+        if value is None:
+            return value
+        try:
+            if not isinstance(value, Decimal):
+                value = Decimal(str(value))
+            return value.quantize(CENT, ROUND_HALF_UP)
+        except ArithmeticError:
+            raise exceptions.ValidationError(
+                self.error_messages["invalid"], code="invalid", params={"value": value}
+            )
+
+    def get_prep_value(self, value) -> Optional[int]:
+        if value is None or hasattr(value, "resolve_expression"):
+            return value
+        return to_cents(value)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(
+            self, **{"form_class": forms.DecimalField, "decimal_places": 2, **kwargs}
+        )
@@ -1,4 +1,6 @@
+from django import forms
 from django.forms import ModelForm
+from .imports import FORMATS
 from .models import Transaction
 
 
@@ -6,3 +8,13 @@ class CreateTransactionForm(ModelForm):
     class Meta:
         model = Transaction
         exclude = ["user", "group"]
+
+
+class ImportTransactionsForm(forms.Form):
+    """Form for uploading a bank statement to import."""
+
+    statement = forms.FileField(help_text="CSV with a header row or OFX file.")
+    file_format = forms.ChoiceField(
+        choices=[("", "Detect from file name")] + [(f, f.upper()) for f in FORMATS],
+        required=False,
+    )
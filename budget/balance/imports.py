@@ -0,0 +1,241 @@
+import csv
+import html
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, TextIO, Tuple
+from django.conf import settings
+from django.db import transaction as db_transaction
+from user.models import MyUser, bump_ledger_version
+from .fields import CENT, fits_cents
+from .models import Transaction
+from . import jobs, occurrences, summaries
+
+BATCH_SIZE = 1000
+# Number of error messages kept per batch, further errors are only counted.
+MAX_BATCH_ERRORS = 20
+FORMATS = ("csv", "ofx")
+
+# Accepted CSV header names for each transaction field, compared case insensitively.
+CSV_COLUMNS = {
+    "date": ("date", "due_date", "booking date", "posted"),
+    "amount": ("amount", "value"),
+    "name": ("name", "payee", "counterparty"),
+    "purpose": ("purpose", "description", "memo", "reference"),
+    "transaction_type": ("type", "transaction_type"),
+}
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y%m%d")
+NAME_LENGTH = Transaction._meta.get_field("name").max_length
+PURPOSE_LENGTH = Transaction._meta.get_field("purpose").max_length
+TRANSACTION_TYPES = dict(Transaction.types)
+
+OFX_TAG = re.compile(r"([^>]+)>([^<]*)")
+
+
+class StatementError(ValueError):
+    """Raised when a file cannot be imported at all, e.g. because required columns are missing."""
+
+
+class BatchReport(NamedTuple):
+    """Outcome of one imported batch. errors holds tuples (row number, message) for at most MAX_BATCH_ERRORS rows."""
+
+    number: int
+    rows: int
+    created: int
+    error_count: int
+    errors: List[Tuple[int, str]]
+
+
+def parse_csv(stream: TextIO) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Takes a text stream of a CSV file with a header row as argument and yields a tuple (row number, raw fields) for
+    every row. Reads one row at a time."""
+    reader = csv.reader(stream)
+    header = [column.strip().lower() for column in next(reader, [])]
+    positions = {}
+    for field, names in CSV_COLUMNS.items():
+        for name in names:
+            if name in header:
+                positions[field] = header.index(name)
+                break
+    missing = {"date", "amount"} - positions.keys()
+    if missing:
+        raise StatementError(f"Missing column(s): {', '.join(sorted(missing))}.")
+
+    for row in reader:
+        if not any(row):
+            continue
+        yield reader.line_num, {
+            field: row[position].strip() if position < len(row) else ""
+            for field, position in positions.items()
+        }
+
+
+def parse_ofx(
+    stream: TextIO, chunk_size: int = 65536
+) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Takes a text stream of an OFX file (SGML or XML flavour) as argument and yields a tuple (transaction number, raw
+    fields) for every STMTTRN block. Reads the file in chunks, so files without line breaks are streamed as well.
+    """
+    number = 0
+    fields = None
+    rest = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        parts = (rest + chunk).split("<")
+        # The last part may continue in the next chunk.
+        rest = parts.pop() if chunk else ""
+        for part in parts:
+            match = OFX_TAG.match(part)
+            if match is None:
+                continue
+            tag, value = match.group(1).strip().upper(), html.unescape(
+                match.group(2).strip()
+            )
+            if tag == "STMTTRN":
+                fields = {}
+            elif tag == "/STMTTRN" and fields is not None:
+                number += 1
+                yield number, {
+                    "date": fields.get("DTPOSTED", "")[:8],
+                    "amount": fields.get("TRNAMT", ""),
+                    "name": fields.get("NAME") or fields.get("PAYEE", ""),
+                    "purpose": fields.get("MEMO", ""),
+                }
+                fields = None
+            elif fields is not None and not tag.startswith("/"):
+                fields[tag] = value
+        if not chunk:
+            return
+
+
+def parse(stream: TextIO, file_format: str) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Takes a text stream and a file format (csv or ofx) as arguments and returns the matching row generator."""
+    if file_format == "csv":
+        return parse_csv(stream)
+    if file_format == "ofx":
+        return parse_ofx(stream)
+    raise StatementError(
+        f"Unknown format {file_format}, expected one of {', '.join(FORMATS)}."
+    )
+
+
+def format_of(filename: str) -> str:
+    """Takes a file name as argument and returns the import format derived from its extension (csv if unknown)."""
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else "csv"
+
+
+def parse_date(value: str) -> date:
+    """Takes a date string in one of the accepted formats as argument and returns the date."""
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date {value!r}.")
+
+
+def build_transaction(fields: Dict[str, str], user: MyUser, group) -> Transaction:
+    """Takes raw fields of a statement row, the importing user and the owning group as arguments and returns an unsaved
+    one off transaction. Negative amounts become expenses unless a type is given. Raises ValueError if a field is
+    invalid, including amounts too large for the amount column."""
+    due_date = parse_date(fields["date"])
+    value = fields["amount"].replace(" ", "")
+    # A comma is the decimal separator if there is no point, a thousands separator otherwise.
+    value = value.replace(",", "") if "." in value else value.replace(",", ".")
+    try:
+        amount = Decimal(value).quantize(CENT)
+        if not fits_cents(amount):
+            raise InvalidOperation(value)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {fields['amount']!r}.")
+    transaction_type = fields.get("transaction_type", "").capitalize()
+    if transaction_type and transaction_type not in TRANSACTION_TYPES:
+        raise ValueError(f"Invalid type {fields['transaction_type']!r}.")
+    if not transaction_type:
+        transaction_type = "Expense" if amount < 0 else "Income"
+
+    name = fields.get("name") or fields.get("purpose") or "Imported"
+    purpose = fields.get("purpose") or name
+    if len(name) > NAME_LENGTH or len(purpose) > PURPOSE_LENGTH:
+        raise ValueError(f"Name or purpose longer than {NAME_LENGTH} characters.")
+    return Transaction(
+        user=user,
+        group=group,
+        transaction_type=transaction_type,
+        name=name,
+        purpose=purpose,
+        amount=abs(amount),
+        due_date=due_date,
+        repeat_pattern="one off",
+    )
+
+
+def validate(
+    rows: Iterable[Tuple[int, Dict[str, str]]], user: MyUser, group
+) -> Tuple[List[Transaction], List[Tuple[int, str]]]:
+    """Takes a chunk of parsed rows, the importing user and the owning group as arguments and returns a tuple
+    (transactions, errors) with the unsaved transactions of all valid rows and (row number, message) for the others.
+    """
+    transactions = []
+    errors = []
+    for number, fields in rows:
+        try:
+            transactions.append(build_transaction(fields, user, group))
+        except ValueError as error:
+            errors.append((number, str(error)))
+    return transactions, errors
+
+
+def save_batch(transactions: List[Transaction]) -> int:
+    """Takes unsaved transactions of one owner as arguments and inserts them with a single bulk insert. bulk_create does
+    not send signals, so occurrences, summaries and the ledger version are updated here. With RECOMPUTE_IN_BACKGROUND the
+    occurrences are left to the recompute worker. Returns number of rows written.
+    """
+    if not transactions:
+        return 0
+    with db_transaction.atomic():
+        created = Transaction.objects.bulk_create(transactions)
+        owner = created[0]
+        if settings.RECOMPUTE_IN_BACKGROUND:
+            ranges = [jobs.affected_range(transaction) for transaction in created]
+            jobs.enqueue(
+                owner.user_id,
+                owner.group_id,
+                min(start for start, _ in ranges),
+                max(end for _, end in ranges),
+            )
+        else:
+            horizon = occurrences.get_horizon()
+            if horizon is not None:
+                occurrences.materialize(created, horizon.start, horizon.end)
+        summaries.invalidate(owner.user_id, owner.group_id)
+        bump_ledger_version(owner.user_id, owner.group_id)
+    return len(created)
+
+
+def import_transactions(
+    stream: TextIO, file_format: str, user: MyUser, batch_size: int = BATCH_SIZE
+) -> Iterator[BatchReport]:
+    """Takes a text stream, its format (csv or ofx), the importing user and a batch size as arguments and imports all
+    rows into the ledger the user acts on. Rows are parsed, validated and inserted one batch at a time, so memory stays
+    flat for large files. Yields a BatchReport after every batch, invalid rows are skipped and reported.
+    """
+    group = user.get_active_group()
+    rows = parse(stream, file_format)
+    number = 0
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        number += 1
+        transactions, errors = validate(chunk, user, group)
+        created = save_batch(transactions)
+        yield BatchReport(
+            number=number,
+            rows=len(chunk),
+            created=created,
+            error_count=len(errors),
+            errors=errors[:MAX_BATCH_ERRORS],
+        )
@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import DateField, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+from user.models import bump_ledger_version
+from .models import (
+    RecomputeJob,
+    Transaction,
+    TransactionOccurrence,
+    add_months,
+    month_bounds,
+)
+from .precompute import compute_chunk, owned, save_chunk
+from . import occurrences, summaries
+
+# Number of months from the current one whose summaries a job stores again.
+WARM_MONTHS = 3
+
+
+def owner_fields(user_id: int, group_id: Optional[int]) -> dict:
+    """Takes the owner fields of a transaction as arguments and returns the owner fields {user_id, group_id} of a job."""
+    if group_id is not None:
+        return {"user_id": None, "group_id": group_id}
+    return {"user_id": user_id, "group_id": None}
+
+
+def affected_range(transaction: Transaction) -> Tuple[date, date]:
+    """Takes a transaction as argument and returns a tuple (start, end) of the whole months it may be due in. Open ended
+    transactions reach to date.max."""
+    start = transaction.due_date.replace(day=1)
+    if (
+        transaction.repeat_pattern == "one off"
+        and transaction.transaction_type != "Loan"
+    ):
+        last = transaction.due_date
+    elif transaction.end_date is not None:
+        last = transaction.end_date
+    else:
+        return start, date.max
+    return start, month_bounds(last.month, last.year)[1]
+
+
+def enqueue(user_id: int, group_id: Optional[int], start: date, end: date):
+    """Takes the owner fields of a transaction, start and end date as arguments and schedules the recomputation of that
+    owner's derived data in between. Widens the range of the owner's pending job if there is one.
+    """
+    owner = owner_fields(user_id, group_id)
+    pending = RecomputeJob.objects.filter(**owner, claimed_at__isnull=True)
+    widen = {
+        "start": Least("start", Value(start, output_field=DateField())),
+        "end": Greatest("end", Value(end, output_field=DateField())),
+    }
+    if pending.update(**widen):
+        return
+    try:
+        with db_transaction.atomic():
+            RecomputeJob.objects.create(**owner, start=start, end=end)
+    except IntegrityError:
+        # Another write created the pending job in the meantime.
+        pending.update(**widen)
+
+
+def enqueue_transaction(transaction: Transaction):
+    """Takes a written or deleted transaction as argument and schedules the recomputation of the months it affects."""
+    enqueue(transaction.user_id, transaction.group_id, *affected_range(transaction))
+
+
+def claim(limit: int) -> List[RecomputeJob]:
+    """Takes a maximum number of jobs as argument and marks that many of the oldest pending jobs as claimed, skipping
+    owners that already have a claimed job. Returns the claimed jobs. Every job is claimed by exactly one caller, also
+    with several workers."""
+    busy = set(
+        RecomputeJob.objects.filter(claimed_at__isnull=False).values_list(
+            "user_id", "group_id"
+        )
+    )
+    candidates = RecomputeJob.objects.filter(claimed_at__isnull=True).order_by(
+        "created"
+    )
+    claimed = []
+    for job in candidates[: limit + len(busy)]:
+        if (job.user_id, job.group_id) in busy or len(claimed) == limit:
+            continue
+        now = timezone.now()
+        if RecomputeJob.objects.filter(id=job.id, claimed_at__isnull=True).update(
+            claimed_at=now
+        ):
+            job.claimed_at = now
+            claimed.append(job)
+    return claimed
+
+
+def release(job: RecomputeJob):
+    """Takes a claimed job as argument and hands its range back to the queue, merged into the owner's pending job."""
+    with db_transaction.atomic():
+        job.delete()
+        enqueue(job.user_id, job.group_id, job.start, job.end)
+
+
+def release_stale(older_than: timedelta) -> int:
+    """Takes a duration as argument and releases all jobs that were claimed longer ago, e.g. by a worker that was
+    killed. Returns number of released jobs."""
+    stale = RecomputeJob.objects.filter(claimed_at__lt=timezone.now() - older_than)
+    jobs = list(stale)
+    for job in jobs:
+        release(job)
+    return len(jobs)
+
+
+def run(job: RecomputeJob, today: Optional[date] = None):
+    """Takes a claimed job as argument and recomputes the derived data of its owner: rematerializes the occurrences in
+    the job's range (within the horizon), drops the stored summaries and bumps the ledger version so cached pages are
+    rebuilt, then stores the summaries of the coming months again. Deletes the job when done.
+    """
+    kind, owner_id = ("group", job.group_id) if job.group_id else ("user", job.user_id)
+    horizon = occurrences.get_horizon()
+    with db_transaction.atomic():
+        if horizon is not None:
+            start, end = max(job.start, horizon.start), min(job.end, horizon.end)
+            if start <= end:
+                TransactionOccurrence.objects.filter(**owned(kind, [owner_id])).filter(
+                    date__range=(start, end)
+                ).delete()
+                occurrences.materialize(
+                    Transaction.objects.filter(**owned(kind, [owner_id]))
+                    .active_between(start, end)
+                    .iterator(chunk_size=occurrences.BATCH_SIZE),
+                    start,
+                    end,
+                )
+        summaries.invalidate(job.user_id, job.group_id)
+        bump_ledger_version(job.user_id, job.group_id)
+
+    this_month = (today or date.today()).replace(day=1)
+    first = max(job.start, this_month)
+    last = min(job.end, add_months(this_month, WARM_MONTHS) - timedelta(days=1))
+    if first <= last:
+        months = (last.year - first.year) * 12 + last.month - first.month + 1
+        save_chunk(compute_chunk(kind, [owner_id], first, months), first, months)
+    job.delete()
@@ -0,0 +1,336 @@
+import io
+import math
+import random
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import date
+from http.cookiejar import CookieJar
+from http.cookies import SimpleCookie
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib import error, request as urllib_request
+from urllib.parse import urlencode
+from django.urls import Resolver404, resolve, reverse
+from .forms import CreateTransactionForm
+from .models import Transaction, add_months
+from .pagination import SORT_KEYS
+
+# Relative weight of every page view in the default mix.
+MIX = {
+    "balance": 4,
+    "welcome": 3,
+    "expenses": 1,
+    "incomes": 1,
+    "loans": 1,
+    "create": 1,
+    "update": 1,
+}
+# Month navigation covers this many months before and after the current one.
+NAVIGATION_MONTHS = 6
+
+
+class Sample(NamedTuple):
+    """One timed request. key is the method followed by the url name, e.g. GET balance."""
+
+    key: str
+    status: int
+    seconds: float
+
+
+class Session(ABC):
+    """Abstract base class of the clients of one visitor. Keeps the visitor's cookies, times every request and records it as a
+    Sample."""
+
+    def __init__(self):
+        self.samples: List[Sample] = []
+
+    @abstractmethod
+    def send(
+        self, method: str, path: str, body: bytes, headers: Dict
+    ) -> Tuple[int, bytes]:
+        """Send a request and return a tuple (status, body) of the response."""
+
+    @abstractmethod
+    def csrf_token(self) -> Optional[str]:
+        """Return the CSRF token set as cookie, None if there is none yet."""
+
+    def request(
+        self, method: str, path: str, data: Optional[Dict] = None
+    ) -> Tuple[int, bytes]:
+        """Takes a method, a path and form data to post as arguments, sends the request and returns a tuple (status,
+        body) of the response. Redirects are not followed. Posts carry the CSRF token.
+        """
+        headers = {}
+        body = b""
+        if data is not None:
+            token = self.csrf_token()
+            if token:
+                data = {**data, "csrfmiddlewaretoken": token}
+            body = urlencode(data).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        started = time.perf_counter()
+        status, content = self.send(method, path, body, headers)
+        self.samples.append(
+            Sample(f"{method} {url_name(path)}", status, time.perf_counter() - started)
+        )
+        return status, content
+
+
+class WSGISession(Session):
+    """Client calling a WSGI application in this process."""
+
+    def __init__(self, application: Callable, host: str):
+        super().__init__()
+        self.application = application
+        self.host = host
+        self.cookies = SimpleCookie()
+
+    def csrf_token(self):
+        cookie = self.cookies.get("csrftoken")
+        return cookie.value if cookie else None
+
+    def send(self, method, path, body, headers):
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "SCRIPT_NAME": "",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "HTTP_HOST": self.host,
+            "CONTENT_LENGTH": str(len(body)),
+            "CONTENT_TYPE": headers.get("Content-Type", ""),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        if self.cookies:
+            environ["HTTP_COOKIE"] = "; ".join(
+                f"{name}={morsel.value}" for name, morsel in self.cookies.items()
+            )
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response["status"] = int(status.split()[0])
+            for name, value in response_headers:
+                if name.lower() == "set-cookie":
+                    self.cookies.load(value)
+
+        result = self.application(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], content
+
+
+class NoRedirect(urllib_request.HTTPRedirectHandler):
+    """Handler passing redirects on as responses instead of following them."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession(Session):
+    """Client sending requests to a running server."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = urllib_request.build_opener(
+            urllib_request.HTTPCookieProcessor(self.cookies), NoRedirect
+        )
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return None
+
+    def send(self, method, path, body, headers):
+        request = urllib_request.Request(
+            self.base_url + path,
+            data=body if method == "POST" else None,
+            headers=headers,
+            method=method,
+        )
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.read()
+        except error.HTTPError as response:
+            return response.code, response.read()
+
+
+def url_name(path: str) -> str:
+    """Takes a path as argument and returns the name of its url pattern, the path itself if it has none."""
+    try:
+        return resolve(path.partition("?")[0]).url_name or path
+    except Resolver404:
+        return path
+
+
+def is_error(sample: Sample) -> bool:
+    """Takes a Sample as argument and returns True if the request failed. Successful form posts redirect."""
+    if sample.key.startswith("POST"):
+        return sample.status != 302
+    return sample.status >= 400
+
+
+class Visitor:
+    """Synthetic user browsing the app through a Session: navigates months on the balance and welcome pages, opens the
+    lists and creates and updates transactions."""
+
+    def __init__(
+        self,
+        session: Session,
+        username: str,
+        password: str,
+        transactions: List[Transaction],
+    ):
+        self.session = session
+        self.username = username
+        self.password = password
+        self.forms = [
+            (transaction.id, update_data(transaction)) for transaction in transactions
+        ]
+        self.actions = {
+            "balance": self.balance,
+            "welcome": self.welcome,
+            "expenses": self.transaction_list("expenses"),
+            "incomes": self.transaction_list("incomes"),
+            "loans": self.transaction_list("loans"),
+            "create": self.create,
+            "update": self.update,
+        }
+
+    def login(self) -> bool:
+        """Log in through the login form. Returns True on success."""
+        self.session.request("GET", reverse("login"))
+        status, _ = self.session.request(
+            "POST",
+            reverse("login"),
+            {"username": self.username, "password": self.password},
+        )
+        return status == 302
+
+    def browse(self, mix: Dict[str, int], deadline: float):
+        """Take random actions weighted by mix until the deadline (a time.perf_counter value) has passed."""
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            self.actions[random.choices(names, weights)[0]]()
+
+    def month(self) -> int:
+        """Return a random month around the current one in the monthyear format of the urls."""
+        day = add_months(
+            date.today().replace(day=1),
+            random.randint(-NAVIGATION_MONTHS, NAVIGATION_MONTHS),
+        )
+        return int(f"{day.month}{day.year}")
+
+    def balance(self):
+        """Open the balance page of a random month."""
+        self.session.request("GET", reverse("balance", args=[self.month()]))
+
+    def welcome(self):
+        """Open the welcome calendar of a random month."""
+        self.session.request("GET", reverse("welcome", args=[self.month()]))
+
+    def transaction_list(self, name):
+        """Return an action opening the list of url name with a random sort order."""
+
+        def view():
+            sort = random.choice(list(SORT_KEYS))
+            self.session.request("GET", f"{reverse(name)}?sort={sort}")
+
+        return view
+
+    def create(self):
+        """Open the create form and post a new transaction."""
+        self.session.request("GET", reverse("create"))
+        self.session.request(
+            "POST",
+            reverse("create"),
+            {
+                "transaction_type": random.choice(["Income", "Expense"]),
+                "name": "Load test",
+                "purpose": "load test",
+                "amount": f"{random.randrange(100, 100_000) / 100:.2f}",
+                "due_date": date.today().isoformat(),
+                "repeat_pattern": random.choice(["one off", "monthly", "weekly"]),
+            },
+        )
+
+    def update(self):
+        """Open the update form of one of the visitor's transactions and post a new amount."""
+        if not self.forms:
+            return self.create()
+        pk, data = random.choice(self.forms)
+        self.session.request("GET", reverse("update", args=[pk]))
+        data["amount"] = f"{random.randrange(100, 100_000) / 100:.2f}"
+        self.session.request("POST", reverse("update", args=[pk]), data)
+
+
+def update_data(transaction: Transaction) -> Dict[str, str]:
+    """Takes a transaction as argument and returns the form data posting its current values."""
+    initial = CreateTransactionForm(instance=transaction).initial
+    return {name: str(value) for name, value in initial.items() if value is not None}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Takes a mix like balance=4,welcome=3 as argument and returns it as dictionary. Raises ValueError for unknown
+    actions or invalid weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in MIX:
+            raise ValueError(
+                f"Unknown action {name}, expected one of {', '.join(MIX)}."
+            )
+        mix[name] = int(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name} must not be negative.")
+    if not any(mix.values()):
+        raise ValueError("At least one weight must be positive.")
+    return mix
+
+
+def percentile(ordered: List[float], percent: float) -> float:
+    """Takes sorted values and a percentage as arguments and returns the value below which that percentage of the values
+    lie (nearest rank)."""
+    index = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def summarize(samples: List[Sample], seconds: float) -> List[Dict]:
+    """Takes the samples of a run and its duration as arguments and returns one dictionary {key, requests, errors,
+    throughput, p50, p95, p99} per key, latencies in milliseconds, sorted by key."""
+    by_key = defaultdict(list)
+    for sample in samples:
+        by_key[sample.key].append(sample)
+    rows = []
+    for key, key_samples in sorted(by_key.items()):
+        timings = sorted(sample.seconds * 1000 for sample in key_samples)
+        rows.append(
+            {
+                "key": key,
+                "requests": len(key_samples),
+                "errors": sum(is_error(sample) for sample in key_samples),
+                "throughput": len(key_samples) / seconds,
+                "p50": percentile(timings, 50),
+                "p95": percentile(timings, 95),
+                "p99": percentile(timings, 99),
+            }
+        )
+    return rows
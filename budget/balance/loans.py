@@ -0,0 +1,132 @@
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+from django.core.cache import cache
+from .fields import from_cents, to_cents
+import numpy as np
+
+
+class LoanSchedule(NamedTuple):
+    """Amortization schedule of a loan. Every array has one entry per repayment, amounts are integer cents."""
+
+    dates: np.ndarray
+    payment: np.ndarray
+    interest: np.ndarray
+    principal: np.ndarray
+    remaining: np.ndarray
+
+    def __len__(self):
+        return len(self.dates)
+
+    def rows(self) -> Iterator[Tuple[date, Decimal, Decimal, Decimal, Decimal]]:
+        """Yield a tuple (date, payment, interest, principal, remaining balance) for every repayment."""
+        for i in range(len(self)):
+            yield (
+                self.dates[i].item(),
+                from_cents(self.payment[i]),
+                from_cents(self.interest[i]),
+                from_cents(self.principal[i]),
+                from_cents(self.remaining[i]),
+            )
+
+    def payments_between(self, start: date, end: date) -> List[Tuple[date, Decimal]]:
+        """Takes start and end date as arguments and returns a list of tuples (date, payment) for every repayment in
+        between (inclusive). The dates are sorted, so the window is found with a binary search and only its rows are
+        converted."""
+        first = np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        last = np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        return [
+            (self.dates[i].item(), from_cents(self.payment[i]))
+            for i in range(first, last)
+        ]
+
+
+def payment_dates(first: date, months: int) -> np.ndarray:
+    """Takes the first repayment date and a number of months as arguments and returns the monthly repayment dates as
+    datetime64[D], with the day clamped to the length of shorter months."""
+    month_starts = np.datetime64(first, "M") + np.arange(months)
+    month_lengths = (month_starts + 1).astype("datetime64[D]") - month_starts.astype(
+        "datetime64[D]"
+    )
+    days = np.minimum(first.day, month_lengths.astype(np.int64)) - 1
+    return month_starts.astype("datetime64[D]") + days
+
+
+def amortize(
+    principal: int,
+    annual_rate: Decimal,
+    term_months: int,
+    first: date,
+    payment: Optional[int] = None,
+) -> LoanSchedule:
+    """Takes the principal (in cents), the annual interest rate in percent, the term in months, the first repayment date
+    and optionally a fixed monthly payment (in cents) as arguments and returns the LoanSchedule. Without a fixed payment
+    the annuity is used. All remaining balances are evaluated at once with the closed form of the annuity recurrence."""
+    rate = float(annual_rate or 0) / 1200
+    fixed_payment = payment is not None
+    if not fixed_payment:
+        if rate:
+            payment = round(principal * rate / (1 - (1 + rate) ** -term_months))
+        else:
+            payment = -(-principal // term_months)
+
+    k = np.arange(term_months + 1)
+    if rate:
+        growth = (1 + rate) ** k
+        remaining = principal * growth - payment * (growth - 1) / rate
+    else:
+        remaining = principal - payment * k
+    remaining = np.round(remaining).astype(np.int64)
+
+    paid_off = np.flatnonzero(remaining[1:] <= 0)
+    count = int(paid_off[0]) + 1 if len(paid_off) else term_months
+    remaining = remaining[: count + 1]
+    principal_part = remaining[:-1] - remaining[1:]
+    payments = np.full(count, payment, dtype=np.int64)
+    interest = payments - principal_part
+
+    if len(paid_off) or not fixed_payment:
+        # The last repayment clears whatever is left, including rounding differences.
+        interest[-1] = round(remaining[-2] * rate)
+        principal_part[-1] = remaining[-2]
+        payments[-1] = principal_part[-1] + interest[-1]
+        remaining[-1] = 0
+
+    return LoanSchedule(
+        dates=payment_dates(first, count),
+        payment=payments,
+        interest=interest,
+        principal=principal_part,
+        remaining=remaining[1:],
+    )
+
+
+def schedule_key(transaction) -> str:
+    """Takes a loan transaction as argument and returns its cache key. The key contains every field the schedule
+    depends on, so editing the loan invalidates the cached schedule."""
+    return "loan-schedule:{}:{}:{}:{}:{}:{}".format(
+        transaction.pk,
+        to_cents(transaction.amount),
+        transaction.interest_rate,
+        transaction.term_months,
+        transaction.payment,
+        transaction.due_date.isoformat(),
+    )
+
+
+def get_schedule(transaction) -> Optional[LoanSchedule]:
+    """Takes a transaction as argument and returns its cached LoanSchedule, computing it on a miss. Returns None if the
+    transaction is not a loan with a term."""
+    if transaction.transaction_type != "Loan" or not transaction.term_months:
+        return None
+    return cache.get_or_set(
+        schedule_key(transaction),
+        lambda: amortize(
+            to_cents(transaction.amount),
+            transaction.interest_rate,
+            transaction.term_months,
+            transaction.due_date,
+            None if transaction.payment is None else to_cents(transaction.payment),
+        ),
+        timeout=None,
+    )
@@ -0,0 +1,219 @@
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import date
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as db_transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from balance import occurrences, summaries, synthetic
+from balance.models import Transaction
+from balance.views import BalanceView
+from home.views import WelcomeView
+from user.middleware import LedgerOwnerMiddleware
+
+# Relative change of the best time that is reported as a regression when comparing with the previous run.
+REGRESSION = 0.1
+VIEWS = ("balance", "welcome", "expenses", "incomes", "loans")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the balance engine (Transaction.active_month, day_balance and monthamount, BalanceView.month_amount and "
+        "WelcomeView.weeks) and the ledger pages on generated ledgers of several sizes and count their queries. Saves "
+        "the results as JSON and compares them with the previous run. All generated rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            default="10,100,1000",
+            help="Comma separated numbers of transactions in the benchmarked ledger.",
+        )
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--output",
+            default="benchmark_engine.json",
+            help="Results file, the previous results in it are compared and replaced.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options["scales"].split(",")]
+        except ValueError:
+            raise CommandError("Scales must be comma separated numbers.")
+        if min(scales) < 1 or options["repeat"] < 1:
+            raise CommandError("Scales and repeat must be positive.")
+        random.seed(options["seed"])
+        self.repeat = options["repeat"]
+        today = date.today()
+        self.month, self.year = today.month, today.year
+        first = date(today.year - options["years"], 1, 1)
+
+        results = []
+        for scale in scales:
+            with db_transaction.atomic():
+                users, _ = synthetic.create_owners(
+                    1, 0, 0, f"benchmark-{uuid.uuid4().hex[:8]}"
+                )
+                synthetic.save(
+                    synthetic.random_transactions(
+                        users, [], scale, first, options["years"]
+                    )
+                )
+                results += self.run_scale(scale, users[0])
+                db_transaction.set_rollback(True)
+
+        previous = self.load(options["output"])
+        self.report(results, previous)
+        with open(options["output"], "w") as output:
+            json.dump(
+                {
+                    "created": timezone.now().isoformat(),
+                    "month": self.month,
+                    "year": self.year,
+                    "materialized": occurrences.get_horizon() is not None,
+                    "repeat": self.repeat,
+                    "results": results,
+                },
+                output,
+                indent=2,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"\nSaved results to {options['output']}.")
+        )
+
+    def run_scale(self, scale, user):
+        """Takes the number of transactions and the user owning them as arguments and returns a list with the result
+        of every benchmark."""
+        month, year = self.month, self.year
+        transactions = list(Transaction.objects.owned_by(user))
+
+        def setup(view_class):
+            view = view_class()
+            view.setup(self.request(user, "/"), monthyear=int(f"{month}{year}"))
+            return view
+
+        def cold():
+            """Drop the stored summaries and the cached calendar, so the views compute them again."""
+            summaries.invalidate(user.id, None)
+            cache.delete(setup(WelcomeView).calendar_key())
+
+        def view_method(view_class, method):
+            return lambda: getattr(setup(view_class), method)()
+
+        benchmarks = [
+            (
+                "Transaction.active_month",
+                lambda: [t.active_month(month, year) for t in transactions],
+                None,
+            ),
+            (
+                "Transaction.day_balance",
+                lambda: [t.day_balance(month, year) for t in transactions],
+                None,
+            ),
+            (
+                "Transaction.monthamount",
+                lambda: [t.monthamount(month, year) for t in transactions],
+                None,
+            ),
+            (
+                "BalanceView.month_amount",
+                view_method(BalanceView, "month_amount"),
+                cold,
+            ),
+            ("WelcomeView.weeks", view_method(WelcomeView, "weeks"), None),
+        ]
+        for name in VIEWS:
+            args = [int(f"{month}{year}")] if name in ("balance", "welcome") else []
+            benchmarks.append((f"view:{name}", self.view(user, name, args), cold))
+
+        results = []
+        for name, func, prepare in benchmarks:
+            results.append(
+                {"scale": scale, "name": name, **self.measure(func, prepare)}
+            )
+        return results
+
+    def request(self, user, path):
+        """Return a GET request of the user, with the attributes set by the middleware."""
+        request = RequestFactory().get(path)
+        request.user = user
+        LedgerOwnerMiddleware(lambda request: None)(request)
+        return request
+
+    def view(self, user, name, args):
+        """Return a function requesting the page of a url name as user and rendering the response."""
+        path = reverse(name, args=args)
+        match = resolve(path)
+
+        def run():
+            response = match.func(self.request(user, path), *match.args, **match.kwargs)
+            if response.status_code != 200:
+                raise CommandError(f"{path} answered {response.status_code}.")
+            if hasattr(response, "render"):
+                response.render()
+            return response
+
+        return run
+
+    def measure(self, func, prepare=None):
+        """Takes a function and an optional function run untimed before every call as arguments and returns the
+        number of queries of the first call and the best and median time of the following calls.
+        """
+        if prepare:
+            prepare()
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        timings = []
+        for _ in range(self.repeat):
+            if prepare:
+                prepare()
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "queries": len(queries),
+            "best_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+        }
+
+    def load(self, path):
+        """Return the results of the previous run as a dictionary keyed by (scale, name), empty if there is none."""
+        if not os.path.exists(path):
+            return {}
+        with open(path) as previous:
+            results = json.load(previous).get("results", [])
+        return {(result["scale"], result["name"]): result for result in results}
+
+    def report(self, results, previous):
+        """Print one line per result with the change against the previous run."""
+        self.stdout.write(
+            f"{'scale':>7}  {'benchmark':<28}{'best':>11}{'median':>11}{'queries':>9}  change"
+        )
+        for result in results:
+            line = (
+                f"{result['scale']:>7}  {result['name']:<28}{result['best_ms']:>9.2f}ms"
+                f"{result['median_ms']:>9.2f}ms{result['queries']:>9}  "
+            )
+            old = previous.get((result["scale"], result["name"]))
+            if old is None:
+                self.stdout.write(line + "new")
+                continue
+            change = (result["best_ms"] - old["best_ms"]) / max(old["best_ms"], 0.001)
+            line += f"{change:+.1%}"
+            if result["queries"] != old["queries"]:
+                line += f", queries {old['queries']} -> {result['queries']}"
+            if change > REGRESSION or result["queries"] > old["queries"]:
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
@@ -0,0 +1,214 @@
+import random
+import time
+import uuid
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.test import RequestFactory
+from balance.models import Transaction, month_bounds
+from balance.pagination import SORT_KEYS, encode_cursor, keyset_queryset
+from balance.views import (
+    ExpenseListView,
+    IncomeListView,
+    KeysetListMixin,
+    LoanListView,
+    find_queryset,
+)
+from user.models import MyUser, UserGroup
+
+# The list views whose queries are benchmarked, by label.
+LIST_VIEWS = {
+    "ExpenseListView": ExpenseListView,
+    "IncomeListView": IncomeListView,
+    "LoanListView": LoanListView,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large transaction table and print the query plans and timings of the list view pages and the "
+        "ledger queries without and with the Transaction indexes (the composite and partial indexes of Meta.indexes "
+        "and the foreign key indexes). Runs in a single database transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--owners", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        self.repeat = options["repeat"]
+        # Only used to run the statements, entering it is not allowed inside a transaction on SQLite.
+        editor = connection.schema_editor(atomic=False)
+        indexes = Transaction._meta.indexes
+
+        with db_transaction.atomic():
+            users, groups = self.create_owners(options["owners"])
+            foreign_key_indexes = self.foreign_key_indexes()
+            for index in indexes:
+                editor.remove_index(Transaction, index)
+            for name, field in foreign_key_indexes:
+                editor.execute(editor._delete_index_sql(Transaction, name))
+
+            started = time.perf_counter()
+            rows = self.generate(users, groups, options["rows"], options["batch_size"])
+            self.stdout.write(
+                f"Inserted {rows} transactions for {len(users)} users and {len(groups)} groups "
+                f"in {time.perf_counter() - started:.1f}s."
+            )
+
+            queries = self.queries(users[0], groups[0])
+            self.report("Without indexes", queries)
+
+            started = time.perf_counter()
+            for index in indexes:
+                editor.add_index(Transaction, index)
+            for name, field in foreign_key_indexes:
+                editor.execute(
+                    editor._create_index_sql(Transaction, fields=[field], name=name)
+                )
+            self.stdout.write(
+                f"\nCreated {len(indexes) + len(foreign_key_indexes)} indexes in "
+                f"{time.perf_counter() - started:.1f}s."
+            )
+            self.report("With indexes", queries)
+
+            db_transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("\nRolled back all generated rows."))
+
+    def foreign_key_indexes(self):
+        """Returns a list of tuples (index name, field) of the single column indexes the database has on the foreign
+        keys of Transaction."""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Transaction._meta.db_table
+            )
+        fields = [
+            field for field in Transaction._meta.concrete_fields if field.is_relation
+        ]
+        return [
+            (name, field)
+            for field in fields
+            for name, constraint in constraints.items()
+            if constraint["index"]
+            and not constraint["unique"]
+            and not constraint["primary_key"]
+            and constraint["columns"] == [field.column]
+        ]
+
+    def create_owners(self, count):
+        """Takes a number of owners as argument and creates that many users, each the only member of one group.
+        Returns a tuple (users, groups)."""
+        prefix = uuid.uuid4().hex[:8]
+        users = MyUser.objects.bulk_create(
+            MyUser(username=f"benchmark-{prefix}-{i}") for i in range(count)
+        )
+        groups = UserGroup.objects.bulk_create(
+            UserGroup(name=f"benchmark-{prefix}-{i}") for i in range(count)
+        )
+        return users, groups
+
+    def generate(self, users, groups, count, batch_size):
+        """Takes users, groups, a number of rows and a batch size as arguments and inserts that many random
+        transactions, half of them in the groups' ledgers. Returns the number of rows inserted.
+        """
+        types = [value for value, _ in Transaction.types]
+        patterns = [value for value, _ in Transaction.repeat_patterns]
+        first = date(2015, 1, 1)
+        batch = []
+        for _ in range(count):
+            owner = random.randrange(len(users))
+            due_date = first + timedelta(days=random.randrange(3650))
+            batch.append(
+                Transaction(
+                    user=users[owner],
+                    group=groups[owner] if random.random() < 0.5 else None,
+                    transaction_type=random.choice(types),
+                    name="benchmark",
+                    purpose="benchmark",
+                    amount=random.randrange(100, 100_000) / 100,
+                    due_date=due_date,
+                    repeat_pattern=random.choice(patterns),
+                    end_date=(
+                        due_date + timedelta(days=random.randrange(30, 1000))
+                        if random.random() < 0.3
+                        else None
+                    ),
+                )
+            )
+            if len(batch) >= batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        return count
+
+    def queries(self, user, group):
+        """Takes a user and a group as arguments and returns a list of tuples (label, queryset) with the queries of the
+        ledger views, once for the user's own ledger and once acting as the group. The list views are benchmarked with
+        the query of their first page and of a page in the middle of the ledger, for every sort option.
+        """
+        member = MyUser(id=user.id, as_group=True, group=group)
+        start, end = month_bounds(6, 2020)
+        queries = []
+        for label, owner in (("user", user), ("group", member)):
+            for name, view_class in LIST_VIEWS.items():
+                queryset = self.list_queryset(view_class, owner)
+                for sort in SORT_KEYS:
+                    queries += [
+                        (
+                            f"{name} sort={sort} first page ({label})",
+                            self.page_queryset(queryset, sort, None),
+                        ),
+                        (
+                            f"{name} sort={sort} middle page ({label})",
+                            self.page_queryset(
+                                queryset, sort, self.middle_cursor(queryset, sort)
+                            ),
+                        ),
+                    ]
+            queries.append(
+                (
+                    f"WelcomeView.get_queryset ({label})",
+                    find_queryset(owner).active_between(start, end),
+                )
+            )
+        return queries
+
+    def list_queryset(self, view_class, owner):
+        """Takes a keyset list view class and an owner as arguments and returns the queryset the view lists for the
+        owner, loading only the columns the view loads."""
+        view = view_class()
+        view.setup(RequestFactory().get("/"))
+        view.request.user = owner
+        return view.get_queryset().only(*KeysetListMixin.list_fields)
+
+    def page_queryset(self, queryset, sort, cursor):
+        """Takes a list queryset, a sort option and an optional cursor as arguments and returns the queryset of the page
+        following the cursor, as keyset_page fetches it."""
+        return keyset_queryset(queryset, sort, cursor)[: KeysetListMixin.page_size + 1]
+
+    def middle_cursor(self, queryset, sort):
+        """Takes a list queryset and a sort option as arguments and returns the cursor of the page starting in the
+        middle of the list, or None if the list is empty."""
+        ordered = keyset_queryset(queryset, sort, None)
+        count = ordered.count()
+        if not count:
+            return None
+        return encode_cursor(sort, ordered[count // 2])
+
+    def report(self, title, queries):
+        """Takes a title and a list of tuples (label, queryset) as arguments and prints the query plan and the best
+        time out of the configured repeats of every query."""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{title}"))
+        for label, queryset in queries:
+            timings = []
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                rows = len(queryset.all())
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f"{label}: {rows} rows, {min(timings) * 1000:.2f}ms")
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"    {line}")
@@ -0,0 +1,40 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from balance import exports
+from user.models import MyUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the transactions or their occurrences between two dates of the ledger a user currently acts on as CSV "
+        "or JSON, written while they are read from the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("--kind", choices=exports.KINDS, default="transactions")
+        parser.add_argument("--format", choices=exports.FORMATS, default="csv")
+        parser.add_argument("--start", type=date.fromisoformat)
+        parser.add_argument("--end", type=date.fromisoformat)
+        parser.add_argument("--output", help="File to write to, default stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            user = MyUser.objects.select_related("group").get(
+                username=options["username"]
+            )
+        except MyUser.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist.")
+        year = date.today().year
+        start = options["start"] or date(year, 1, 1)
+        end = options["end"] or date(year, 12, 31)
+        if end < start:
+            raise CommandError("End must not be before start.")
+
+        pieces = exports.export(options["kind"], options["format"], user, start, end)
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                output.writelines(pieces)
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending="")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from balance import occurrences
+
+
+class Command(BaseCommand):
+    help = "Move the occurrence horizon forward to today, materializing newly covered months. Meant to run daily."
+
+    def handle(self, *args, **options):
+        written = occurrences.extend_horizon()
+        horizon = occurrences.get_horizon()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {written} occurrences, horizon is now {horizon}."
+            )
+        )
@@ -0,0 +1,60 @@
+import random
+import time
+import uuid
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from balance import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, groups with members and transactions of every type and repeat pattern, with due "
+        "dates spread over several years. All users and groups share one password, for trying out the app at scale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--members", type=int, default=3, help="Members per group.")
+        parser.add_argument(
+            "--transactions", type=int, default=50, help="Transactions per ledger."
+        )
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument(
+            "--first",
+            type=date.fromisoformat,
+            help="First possible due date, default January 1st years ago.",
+        )
+        parser.add_argument(
+            "--prefix", help="Prefix of user and group names, default random."
+        )
+        parser.add_argument("--password", default=synthetic.PASSWORD)
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        if min(options["users"], options["years"]) < 1 or options["groups"] < 0:
+            raise CommandError("Users and years must be positive, groups not negative.")
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+        prefix = options["prefix"] or f"synthetic-{uuid.uuid4().hex[:6]}"
+        first = options["first"] or date(date.today().year - options["years"], 1, 1)
+
+        started = time.perf_counter()
+        users, groups = synthetic.create_owners(
+            options["users"],
+            options["groups"],
+            options["members"],
+            prefix,
+            options["password"],
+        )
+        written = synthetic.save(
+            synthetic.random_transactions(
+                users, groups, options["transactions"], first, options["years"]
+            )
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users)} users and {len(groups)} groups named {prefix}-<n> with {written} transactions "
+                f"in {time.perf_counter() - started:.1f}s. Password: {options['password']}"
+            )
+        )
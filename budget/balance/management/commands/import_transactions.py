@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from balance import imports
+from user.models import MyUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a CSV or OFX bank statement into the ledger a user currently acts on (the user's own ledger or the "
+        "active group's), reporting every batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("username")
+        parser.add_argument("--format", choices=imports.FORMATS)
+        parser.add_argument("--batch-size", type=int, default=imports.BATCH_SIZE)
+        parser.add_argument("--encoding", default="utf-8-sig")
+
+    def handle(self, *args, **options):
+        try:
+            user = MyUser.objects.select_related("group").get(
+                username=options["username"]
+            )
+        except MyUser.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist.")
+        file_format = options["format"] or imports.format_of(options["path"])
+
+        created = errors = 0
+        with open(
+            options["path"], encoding=options["encoding"], errors="replace", newline=""
+        ) as stream:
+            try:
+                for report in imports.import_transactions(
+                    stream, file_format, user, options["batch_size"]
+                ):
+                    created += report.created
+                    errors += report.error_count
+                    self.stdout.write(
+                        f"Batch {report.number}: {report.created} of {report.rows} rows imported."
+                    )
+                    for row, message in report.errors:
+                        self.stderr.write(f"    Row {row}: {message}")
+                    if report.error_count > len(report.errors):
+                        self.stderr.write(
+                            f"    ... {report.error_count - len(report.errors)} more errors."
+                        )
+            except imports.StatementError as error:
+                raise CommandError(str(error))
+
+        owner = user.get_ledger_owner()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {created} transactions into the ledger of {owner}, skipped {errors} rows."
+            )
+        )
@@ -0,0 +1,162 @@
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from balance import loadtest, synthetic
+from balance.models import Transaction
+from budget.wsgi import application
+from user.models import MyUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of page views (balance and welcome month navigation, the lists, creating and updating "
+        "transactions) from many concurrent threads of synthetic users against budget.wsgi.application in this "
+        "process, or against a running server. Reports throughput and p50/p95/p99 latency per url name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument(
+            "--duration", type=float, default=10.0, help="Seconds to send requests."
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                f"{name}={weight}" for name, weight in loadtest.MIX.items()
+            ),
+            help="Comma separated action=weight pairs.",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base url of a running server using the same database, default is calling the WSGI application "
+            "in this process.",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header of in process requests, must be in ALLOWED_HOSTS.",
+        )
+        parser.add_argument(
+            "--transactions",
+            type=int,
+            default=50,
+            help="Transactions generated for every synthetic user.",
+        )
+        parser.add_argument(
+            "--prefix",
+            help="Use the existing users of generate_data with this prefix instead of creating and deleting users.",
+        )
+        parser.add_argument("--password", default=synthetic.PASSWORD)
+        parser.add_argument("--seed", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadtest.parse_mix(options["mix"])
+        except ValueError as error:
+            raise CommandError(error)
+        if options["threads"] < 1 or options["duration"] <= 0:
+            raise CommandError("Threads and duration must be positive.")
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+
+        created = not options["prefix"]
+        if created:
+            users, _ = synthetic.create_owners(
+                options["threads"],
+                0,
+                0,
+                f"loadtest-{uuid.uuid4().hex[:6]}",
+                options["password"],
+            )
+            first = date(date.today().year - 2, 1, 1)
+            synthetic.save(
+                synthetic.random_transactions(
+                    users, [], options["transactions"], first, 4
+                )
+            )
+        else:
+            users = list(
+                MyUser.objects.filter(
+                    username__startswith=f"{options['prefix']}-"
+                ).order_by("id")
+            )
+            if not users:
+                raise CommandError(f"There are no users named {options['prefix']}-<n>.")
+
+        try:
+            visitors = [
+                self.visitor(users[i % len(users)], options)
+                for i in range(options["threads"])
+            ]
+            self.run(visitors, mix, options["threads"], options["duration"])
+        finally:
+            if created:
+                MyUser.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def visitor(self, user, options):
+        """Return a Visitor of user with a session for the configured target."""
+        if options["url"]:
+            session = loadtest.HTTPSession(options["url"])
+        else:
+            session = loadtest.WSGISession(application, options["host"])
+        transactions = Transaction.objects.owned_by(user).order_by("id")[:20]
+        return loadtest.Visitor(
+            session, user.username, options["password"], transactions
+        )
+
+    def run(self, visitors, mix, threads, duration):
+        """Log all visitors in, let them browse concurrently for duration seconds and print the report."""
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            if not all(pool.map(self.login, visitors)):
+                raise CommandError("Logging in failed, check the password and host.")
+            for visitor in visitors:
+                visitor.session.samples = []
+
+            started = time.perf_counter()
+            deadline = started + duration
+            list(
+                pool.map(lambda visitor: self.browse(visitor, mix, deadline), visitors)
+            )
+            seconds = time.perf_counter() - started
+
+        samples = [sample for visitor in visitors for sample in visitor.session.samples]
+        self.report(
+            loadtest.summarize(samples, seconds), len(samples), seconds, threads
+        )
+
+    def login(self, visitor):
+        """Log a visitor in from a pool thread and return True on success."""
+        try:
+            return visitor.login()
+        finally:
+            close_old_connections()
+
+    def browse(self, visitor, mix, deadline):
+        """Let a visitor browse until the deadline from a pool thread."""
+        try:
+            visitor.browse(mix, deadline)
+        finally:
+            close_old_connections()
+
+    def report(self, rows, requests, seconds, threads):
+        """Print throughput and latency percentiles per url name and in total."""
+        self.stdout.write(
+            f"{'request':<22}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for row in rows:
+            line = (
+                f"{row['key']:<22}{row['requests']:>8}{row['errors']:>8}{row['throughput']:>9.1f}"
+                f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}"
+            )
+            self.stdout.write(self.style.WARNING(line) if row["errors"] else line)
+        errors = sum(row["errors"] for row in rows)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n{requests} requests ({errors} errors) from {threads} threads in {seconds:.1f}s: "
+                f"{requests / seconds:.1f} requests/s."
+            )
+        )
@@ -0,0 +1,37 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from balance import precompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the monthly totals and day amounts of the coming months for every user and group, computed in parallel "
+        "worker processes. Meant to run nightly, so the first views of the day read stored summaries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, default=3)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes, 1 computes in this process.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=precompute.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options["months"] < 1 or options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("Months, workers and chunk size must be positive.")
+
+        started = time.perf_counter()
+        owners = precompute.precompute(
+            options["months"], options["workers"], options["chunk_size"]
+        )
+        seconds = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Precomputed {options['months']} months for {owners} owners with {options['workers']} workers in "
+                f"{seconds:.1f}s ({owners / seconds:.0f} owners/s)."
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from balance import occurrences
+
+
+class Command(BaseCommand):
+    help = "Delete and rebuild the materialized transaction occurrences for the rolling horizon around today."
+
+    def handle(self, *args, **options):
+        written = occurrences.rebuild()
+        horizon = occurrences.get_horizon()
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written} occurrences for {horizon}.")
+        )
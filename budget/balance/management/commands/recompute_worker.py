@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from balance import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Work off the queued recompute jobs: rematerialize the occurrences and store the summaries of the owners whose "
+        "transactions were written, with a pool of threads. Runs until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait for new jobs when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=600,
+            help="Seconds after which jobs claimed by a stopped worker are queued again.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Stop when the queue is empty."
+        )
+
+    def handle(self, *args, **options):
+        if options["threads"] < 1 or options["poll"] <= 0:
+            raise CommandError("Threads and poll interval must be positive.")
+
+        released = jobs.release_stale(timedelta(seconds=options["stale_after"]))
+        if released:
+            self.stdout.write(f"Queued {released} stale jobs again.")
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            while True:
+                claimed = jobs.claim(options["threads"])
+                if not claimed:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+                for job, error in zip(claimed, pool.map(self.run_job, claimed)):
+                    if error is None:
+                        done += 1
+                    else:
+                        self.stderr.write(f"Job {job} failed: {error}")
+                        jobs.release(job)
+                        if options["once"]:
+                            raise CommandError(f"Job {job} failed: {error}")
+                        time.sleep(options["poll"])
+        self.stdout.write(self.style.SUCCESS(f"Finished {done} jobs."))
+
+    def run_job(self, job):
+        """Run a job in a pool thread and return the error it raised, None if it succeeded."""
+        try:
+            jobs.run(job)
+        except Exception as error:
+            return error
+        finally:
+            close_old_connections()
+        return None
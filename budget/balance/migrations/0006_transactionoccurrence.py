@@ -0,0 +1,92 @@
+# Generated by Django 4.2 on 2026-10-18 04:03
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_alter_myuser_as_group"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("balance", "0005_alter_transaction_due_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OccurrenceHorizon",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start", models.DateField()),
+                ("end", models.DateField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="due_date",
+            field=models.DateField(default=datetime.date(2026, 10, 18)),
+        ),
+        migrations.CreateModel(
+            name="TransactionOccurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("amount", models.FloatField()),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="user.usergroup",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrence_set",
+                        to="balance.transaction",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="transactionoccurrence",
+            index=models.Index(
+                fields=["user", "group", "date"], name="balance_tra_user_id_aea5ab_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionoccurrence",
+            index=models.Index(
+                fields=["group", "date"], name="balance_tra_group_i_5794d7_idx"
+            ),
+        ),
+    ]
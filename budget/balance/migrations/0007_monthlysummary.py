@@ -0,0 +1,72 @@
+# Generated by Django 4.2 on 2026-10-18 04:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_alter_myuser_as_group"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("balance", "0006_transactionoccurrence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlySummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.SmallIntegerField()),
+                ("month", models.SmallIntegerField()),
+                ("income", models.FloatField(default=0)),
+                ("expense", models.FloatField(default=0)),
+                ("net", models.FloatField(default=0)),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="user.usergroup",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="monthlysummary",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("group__isnull", True)),
+                fields=("user", "year", "month"),
+                name="unique_user_monthly_summary",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="monthlysummary",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("group__isnull", False)),
+                fields=("group", "year", "month"),
+                name="unique_group_monthly_summary",
+            ),
+        ),
+    ]
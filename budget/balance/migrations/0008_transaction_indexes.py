@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0007_monthlysummary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "due_date"], name="balance_tra_user_id_ad169d_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["group", "due_date"], name="balance_tra_group_i_a4bbb8_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["end_date"], name="balance_tra_end_dat_7ecd64_idx"
+            ),
+        ),
+    ]
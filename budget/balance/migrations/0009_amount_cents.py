@@ -0,0 +1,95 @@
+# Generated by Django 4.2 on 2026-10-18 09:12
+
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import migrations, models
+import balance.fields
+
+BATCH_SIZE = 1000
+
+
+def float_to_cents(apps, schema_editor):
+    """Copy the float amounts of all transactions into integer cents."""
+    Transaction = apps.get_model("balance", "Transaction")
+    batch = []
+    for transaction in Transaction.objects.only("id", "amount").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        transaction.amount_cents = int(
+            (Decimal(str(transaction.amount)) * 100).to_integral_value(ROUND_HALF_UP)
+        )
+        batch.append(transaction)
+        if len(batch) >= BATCH_SIZE:
+            Transaction.objects.bulk_update(batch, ["amount_cents"])
+            batch = []
+    Transaction.objects.bulk_update(batch, ["amount_cents"])
+
+
+def cents_to_float(apps, schema_editor):
+    """Copy the integer cents of all transactions back into float amounts."""
+    Transaction = apps.get_model("balance", "Transaction")
+    Transaction.objects.update(amount=models.F("amount_cents") / 100.0)
+
+
+def clear_derived(apps, schema_editor):
+    """Delete stored summaries and materialized occurrences, which hold amounts in the old unit in both directions. Run
+    the rebuild_occurrences command afterwards; summaries are recomputed on demand."""
+    apps.get_model("balance", "MonthlySummary").objects.all().delete()
+    apps.get_model("balance", "TransactionOccurrence").objects.all().delete()
+    apps.get_model("balance", "OccurrenceHorizon").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0008_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="amount_cents",
+            field=models.BigIntegerField(default=0),
+        ),
+        # Nullable while the amounts are copied, so unapplying can add the float column back before it is filled.
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=models.FloatField(null=True),
+        ),
+        migrations.RunPython(float_to_cents, cents_to_float),
+        migrations.RemoveField(
+            model_name="transaction",
+            name="amount",
+        ),
+        migrations.RenameField(
+            model_name="transaction",
+            old_name="amount_cents",
+            new_name="amount",
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="amount",
+            field=balance.fields.CentsField(),
+        ),
+        migrations.RunPython(clear_derived, clear_derived),
+        migrations.AlterField(
+            model_name="transactionoccurrence",
+            name="amount",
+            field=balance.fields.CentsField(),
+        ),
+        migrations.AlterField(
+            model_name="monthlysummary",
+            name="expense",
+            field=balance.fields.CentsField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="monthlysummary",
+            name="income",
+            field=balance.fields.CentsField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="monthlysummary",
+            name="net",
+            field=balance.fields.CentsField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 04:11
+
+import balance.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0009_amount_cents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="interest_rate",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Loans only: annual interest rate in percent.",
+                max_digits=5,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="payment",
+            field=balance.fields.CentsField(
+                blank=True,
+                help_text="Loans only: fixed monthly repayment. Leave empty to use the annuity.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="term_months",
+            field=models.PositiveSmallIntegerField(
+                blank=True,
+                help_text="Loans only: number of monthly repayments, starting on the due date.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0010_loan_fields"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="balance_tra_user_id_ad169d_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("group__isnull", True)),
+                fields=["user", "due_date"],
+                name="transaction_user_due_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("group__isnull", True)),
+                fields=["user", "transaction_type", "due_date"],
+                name="transaction_user_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["group", "transaction_type", "due_date"],
+                name="transaction_group_type_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0011_transaction_owner_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("group__isnull", True)),
+                fields=["user", "transaction_type", "amount"],
+                name="transaction_user_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("group__isnull", True)),
+                fields=["user", "transaction_type", "name"],
+                name="transaction_user_name_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["group", "transaction_type", "amount"],
+                name="transaction_group_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["group", "transaction_type", "name"],
+                name="transaction_group_name_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("balance", "0012_transaction_sort_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="monthlysummary",
+            name="days",
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 4.2 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("user", "0005_myuser_group_fk"),
+        ("balance", "0013_monthlysummary_days"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecomputeJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("start", models.DateField()),
+                ("end", models.DateField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "claimed_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="user.usergroup",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        default=None,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="recomputejob",
+            index=models.Index(
+                fields=["claimed_at", "created"], name="recompute_job_queue_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recomputejob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("claimed_at__isnull", True), ("group__isnull", True)
+                ),
+                fields=("user",),
+                name="unique_pending_user_job",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recomputejob",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("claimed_at__isnull", True), ("group__isnull", False)
+                ),
+                fields=("group",),
+                name="unique_pending_group_job",
+            ),
+        ),
+    ]
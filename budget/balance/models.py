@@ -1,7 +1,102 @@
 from django.db import models
+from django.db.models.functions import ExtractDay, Least
 from datetime import timedelta, date
 from user.models import MyUser, UserGroup
-from typing import Union, Dict
+from typing import Dict, List, Optional, Tuple
+from decimal import Decimal
+from .fields import CentsField, from_cents
+from .loans import LoanSchedule, get_schedule
+import calendar
+
+# Number of weeks in between repeats for the week based repeat patterns.
+WEEKLY_PATTERNS = {
+    "weekly": 1,
+    "every two weeks": 2,
+    "every three weeks": 3,
+    "every four weeks": 4,
+}
+
+
+def month_bounds(month: int, year: int) -> Tuple[date, date]:
+    """Takes month and year as arguments and returns a tuple (first day, last day) of that month."""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def add_months(day: date, months: int) -> date:
+    """Takes a date and a number of months as arguments and returns the date shifted by that many months. The day is clamped to the last day of the target month."""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class OwnedQuerySet(models.QuerySet):
+    """QuerySet for models that belong to a user or, if a group is set, to a group."""
+
+    def owned_by(self, user: MyUser) -> models.QuerySet:
+        """Takes a user as argument and returns rows of the group the user currently acts as, or the user's own rows."""
+        group = user.get_active_group()
+        if group is not None:
+            return self.filter(group=group)
+        return self.filter(user=user, group__isnull=True)
+
+
+class TransactionQuerySet(OwnedQuerySet):
+    """QuerySet for transactions. Evaluates the repeat patterns with simple month semantics in the database."""
+
+    def month_sums(self, month: int, year: int) -> Dict[str, Decimal]:
+        """Takes month and year as arguments and returns a dictionary {income, expense} holding the totals of all one off
+        and monthly transactions for that month/year, computed in a single aggregate query. Ignores loans and week based repeat patterns."""
+        start, end = month_bounds(month, year)
+        not_ended = models.Q(end_date__isnull=True)
+        one_off = models.Q(repeat_pattern="one off", due_date__range=(start, end)) & (
+            not_ended | models.Q(end_date__gte=models.F("due_date"))
+        )
+        # A monthly transaction is due on its due day, clamped to the length of the month.
+        monthly = models.Q(repeat_pattern="monthly", due_date__lte=end) & (
+            not_ended
+            | models.Q(end_date__gt=end)
+            | models.Q(
+                end_date__gte=start,
+                end_date__day__gte=Least(ExtractDay("due_date"), end.day),
+            )
+        )
+        totals = self.filter(one_off | monthly).aggregate(
+            income=models.Sum(
+                models.Case(
+                    models.When(transaction_type="Income", then=models.F("amount")),
+                    default=0,
+                    output_field=CentsField(),
+                )
+            ),
+            expense=models.Sum(
+                models.Case(
+                    models.When(transaction_type="Expense", then=-models.F("amount")),
+                    default=0,
+                    output_field=CentsField(),
+                )
+            ),
+        )
+        return {key: value or Decimal("0.00") for key, value in totals.items()}
+
+    def active_between(self, start: date, end: date) -> models.QuerySet:
+        """Takes start and end date as arguments and returns only transactions that can be due in between: started
+        before the end, not ended before the start and, if one off (and not a loan), not due before the start."""
+        return self.filter(
+            models.Q(end_date__isnull=True) | models.Q(end_date__gte=start),
+            due_date__lte=end,
+        ).exclude(
+            models.Q(repeat_pattern="one off", due_date__lt=start)
+            & ~models.Q(transaction_type="Loan")
+        )
+
+    def week_based(self) -> models.QuerySet:
+        """Return transactions with a weekly, two-, three- or four-weekly repeat pattern."""
+        return self.filter(repeat_pattern__in=WEEKLY_PATTERNS)
+
+    def amortized_loans(self) -> models.QuerySet:
+        """Return loans with a term, i.e. loans that have an amortization schedule."""
+        return self.filter(transaction_type="Loan", term_months__isnull=False)
 
 
 class Transaction(models.Model):
@@ -21,7 +116,7 @@ class Transaction(models.Model):
         max_length=25, choices=types, default="Expense")
     name = models.CharField(max_length=200)
     purpose = models.CharField(max_length=200)
-    amount = models.FloatField(max_length=6)
+    amount = CentsField()
     due_date = models.DateField(default=date.today())
     repeat_pattern = models.CharField(
         max_length=25, choices=repeat_patterns, default="one off"
@@ -34,14 +129,74 @@ class Transaction(models.Model):
     group = models.ForeignKey(
         UserGroup, blank=True, null=True, default=None, on_delete=models.CASCADE
     )
+    interest_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        help_text="Loans only: annual interest rate in percent.",
+    )
+    term_months = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        help_text="Loans only: number of monthly repayments, starting on the due date.",
+    )
+    payment = CentsField(
+        blank=True,
+        null=True,
+        help_text="Loans only: fixed monthly repayment. Leave empty to use the annuity.",
+    )
 
-    def monthamount(self, month: int, year: int) -> Union[int, float]:
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Individual ledger: user_id = ? AND group_id IS NULL, optionally by type, ranges on due_date.
+            models.Index(
+                fields=["user", "due_date"],
+                condition=models.Q(group__isnull=True),
+                name="transaction_user_due_idx",
+            ),
+            models.Index(
+                fields=["user", "transaction_type", "due_date"],
+                condition=models.Q(group__isnull=True),
+                name="transaction_user_type_idx",
+            ),
+            # List views: keyset pagination by amount or name within one type.
+            models.Index(
+                fields=["user", "transaction_type", "amount"],
+                condition=models.Q(group__isnull=True),
+                name="transaction_user_amount_idx",
+            ),
+            models.Index(
+                fields=["user", "transaction_type", "name"],
+                condition=models.Q(group__isnull=True),
+                name="transaction_user_name_idx",
+            ),
+            # Group ledger: group_id = ?, optionally by type, ranges on due_date.
+            models.Index(fields=["group", "due_date"]),
+            models.Index(
+                fields=["group", "transaction_type", "due_date"],
+                name="transaction_group_type_idx",
+            ),
+            models.Index(
+                fields=["group", "transaction_type", "amount"],
+                name="transaction_group_amount_idx",
+            ),
+            models.Index(
+                fields=["group", "transaction_type", "name"],
+                name="transaction_group_name_idx",
+            ),
+            models.Index(fields=["end_date"]),
+        ]
+
+    def monthamount(self, month: int, year: int) -> Decimal:
         """Takes month and year as arguments and calculates and returns the total amount of a transaction for that month/year."""
-        amount_dict = self.active_month(month, year)
-        amount = 0
-        for value in amount_dict.values():
-            amount += value
-        return amount
+        start, end = month_bounds(month, year)
+        if self.transaction_type == "Loan":
+            amounts = (amount for _, amount in self.dated_amounts(start, end))
+            return sum(amounts, Decimal("0.00"))
+        return self.occurrence_count(start, end) * self.signed_amount
 
     def __str__(self):
         return f"{self.name}"
@@ -61,124 +216,238 @@ class Transaction(models.Model):
             "End Date": self.end_date,
             "Added On": self.date_added,
         }
+        if self.transaction_type == "Loan":
+            attributes["Interest Rate"] = self.interest_rate
+            attributes["Term (Months)"] = self.term_months
+            schedule = self.schedule()
+            if self.payment is None and schedule is not None:
+                attributes["Monthly Payment"] = from_cents(schedule.payment[0])
+            else:
+                attributes["Monthly Payment"] = self.payment
         return attributes
 
-    def day_balance(self, month: int, year: int) -> Union[int, float]:
-        """Takes month and year as arguments and returns a dictionary of format {day: amount} for that month/year depending on the repeat pattern of the transaction. Ignores loans."""
-        
-        if (
-            self.transaction_type == "Loan"
-            or self.due_date.month > month
-            and self.due_date.year >= year
-            or self.due_date.year > year
-        ):
-            return dict()
-        if self.end_date != None:
-            if self.end_date.month < month and self.end_date.year <= year:
-                return dict()
-
-        if self.repeat_pattern == "one off":
-            return self.one_off_day()
+    @property
+    def signed_amount(self) -> Decimal:
+        """Return amount of a single occurrence, negative for expenses."""
+        if self.transaction_type == "Expense":
+            return -self.amount
+        return self.amount
 
-        elif self.repeat_pattern == "monthly":
-            return self.one_off_day()
+    @property
+    def repeat_weeks(self) -> Optional[int]:
+        """Return number of weeks in between repeats for week based repeat patterns, None otherwise."""
+        return WEEKLY_PATTERNS.get(self.repeat_pattern)
 
-        elif self.repeat_pattern == "weekly":
-            return self.weekly_day(month, timedelta(weeks=1))
+    def first_occurrence(self, start: date) -> Optional[date]:
+        """Takes a date as argument and returns the first date on or after it on which the transaction is due, or None if there is none (respecting end date)."""
+        due_date = self.due_date
+        weeks = self.repeat_weeks
 
-        elif self.repeat_pattern == "every two weeks":
-            return self.weekly_day(month, timedelta(weeks=2))
+        if start <= due_date:
+            occurrence = due_date
+        elif weeks is not None:
+            step = weeks * 7
+            occurrence = due_date + timedelta(days=-(-(start - due_date).days // step) * step)
+        elif self.repeat_pattern == "monthly":
+            months = (start.year - due_date.year) * 12 + start.month - due_date.month
+            occurrence = add_months(due_date, months)
+            if occurrence < start:
+                occurrence = add_months(due_date, months + 1)
+        else:
+            return None
 
-        elif self.repeat_pattern == "every three weeks":
-            return self.weekly_day(month, timedelta(weeks=3))
+        if self.end_date is not None and occurrence > self.end_date:
+            return None
+        return occurrence
 
+    def last_occurrence(self, end: date) -> Optional[date]:
+        """Takes a date as argument and returns the last date on or before it on which the transaction is due, or None if there is none (respecting end date)."""
+        due_date = self.due_date
+        weeks = self.repeat_weeks
+        if self.end_date is not None and self.end_date < end:
+            end = self.end_date
+
+        if end < due_date:
+            return None
+        elif weeks is not None:
+            step = weeks * 7
+            return due_date + timedelta(days=(end - due_date).days // step * step)
+        elif self.repeat_pattern == "monthly":
+            months = (end.year - due_date.year) * 12 + end.month - due_date.month
+            occurrence = add_months(due_date, months)
+            if occurrence > end:
+                occurrence = add_months(due_date, months - 1)
+            return occurrence
         else:
-            return self.weekly_day(month, timedelta(weeks=4))
+            return due_date
 
-    def one_off_day(self) -> Dict[int, Union[int, float]]:
-        """Returns a dictionary of format {day: amount} for a one_off or monthly recurring transaction."""
-        dayly_transaction_dict = dict()
+    def occurrence_count(self, start: date, end: date) -> int:
+        """Takes start and end date as arguments and returns the number of times the transaction is due in between (inclusive) without iterating."""
+        first = self.first_occurrence(start)
+        last = self.last_occurrence(end)
+        if first is None or last is None or first > last:
+            return 0
 
-        if self.transaction_type == "Expense":
-            dayly_transaction_dict[self.due_date.day] = -self.amount
+        weeks = self.repeat_weeks
+        if weeks is not None:
+            return (last - first).days // (weeks * 7) + 1
+        elif self.repeat_pattern == "monthly":
+            return (last.year - first.year) * 12 + last.month - first.month + 1
+        else:
+            return 1
+
+    def occurrences(self, start: date, end: date) -> List[date]:
+        """Takes start and end date as arguments and returns a list of all dates in between (inclusive) on which the transaction is due."""
+        count = self.occurrence_count(start, end)
+        if count == 0:
+            return []
+
+        first = self.first_occurrence(start)
+        weeks = self.repeat_weeks
+        if weeks is not None:
+            return [first + timedelta(weeks=weeks * i) for i in range(count)]
+        elif self.repeat_pattern == "monthly":
+            months = (first.year - self.due_date.year) * 12 + first.month - self.due_date.month
+            return [add_months(self.due_date, months + i) for i in range(count)]
         else:
-            dayly_transaction_dict[self.due_date.day] = self.amount
+            return [first]
+
+    def schedule(self) -> Optional[LoanSchedule]:
+        """Return the cached amortization schedule if the transaction is a loan with a term, None otherwise."""
+        return get_schedule(self)
+
+    def dated_amounts(self, start: date, end: date) -> List[Tuple[date, Decimal]]:
+        """Takes start and end date as arguments and returns a list of tuples (date, signed amount) for every time the transaction is due in between (inclusive).
+        Loans contribute their scheduled repayments (up to the end date, if set), loans without a term are ignored."""
+        if self.transaction_type != "Loan":
+            amount = self.signed_amount
+            return [(due_date, amount) for due_date in self.occurrences(start, end)]
+
+        schedule = self.schedule()
+        if schedule is None:
+            return []
+        if self.end_date is not None and self.end_date < end:
+            end = self.end_date
+        return [
+            (due_date, -payment)
+            for due_date, payment in schedule.payments_between(start, end)
+        ]
+
+    def day_balance(self, month: int, year: int) -> Dict[int, Decimal]:
+        """Takes month and year as arguments and returns a dictionary of format {day: amount} for that month/year depending on the repeat pattern of the transaction, or the repayments of a loan."""
+        start, end = month_bounds(month, year)
+        return {due_date.day: amount for due_date, amount in self.dated_amounts(start, end)}
+
+    def active_month(self, month: int = date.today().month, year: int = date.today().year) -> Decimal:
+        """Takes month and year as arguments and returns the total amount for a transaction for that month/year"""
+        return self.monthamount(month, year)
 
-        return dayly_transaction_dict
 
-    def weekly_day(self, month: int, delta: int) -> Dict[int, Union[int, float]]:
-        """Takes month and delta (number of weeks in between repeats) as arguments and returns a dictionary of format {day: amount} for a 1/2/3/4-weekly recurring transaction."""
-        due_date = self.due_date
-        dayly_transaction_dict = dict()
+class TransactionOccurrence(models.Model):
+    """Model representing a single due date of a transaction. Occurrences are materialized over a rolling horizon (see OccurrenceHorizon)."""
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.CASCADE, related_name="occurrence_set"
+    )
+    user = models.ForeignKey(MyUser, on_delete=models.CASCADE)
+    group = models.ForeignKey(
+        UserGroup, blank=True, null=True, default=None, on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    amount = CentsField()
 
-        while due_date.month != month:
-            due_date += delta
+    objects = OwnedQuerySet.as_manager()
 
-        while due_date.month == month:
-            if self.transaction_type == "Expense":
-                dayly_transaction_dict[due_date.day] = -self.amount
-            else:
-                dayly_transaction_dict[due_date.day] = self.amount
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "group", "date"]),
+            models.Index(fields=["group", "date"]),
+        ]
 
-            due_date += delta
+    def __str__(self):
+        return f"{self.transaction_id} {self.date}"
 
-        return dayly_transaction_dict
 
-    def active_month(self, month: int = date.today().month, year: int = date.today().year) -> Union[int, float]:
-        """Takes month and year as arguments and returns the total amount for a transaction for that month/year"""
-        if (
-            self.due_date.month > month
-            and self.due_date.year >= year
-            or self.transaction_type == "Loan"
-        ):
-            return 0
-        elif self.end_date != None:
-            if self.end_date.month < month and self.end_date.year <= year:
-                return 0
-            else:
-                pass
+class OccurrenceHorizon(models.Model):
+    """Model representing the date range (single row) over which transaction occurrences are materialized."""
+    start = models.DateField()
+    end = models.DateField()
 
-        else:
-            if self.repeat_pattern == "one off":
-                if self.due_date.month == month:
-                    if self.transaction_type == "Expense":
-                        return -self.amount
-                    else:
-                        return self.amount
-                else:
-                    return 0
-
-            elif self.repeat_pattern == "monthly":
-                if self.transaction_type == "Expense":
-                    return -self.amount
-                else:
-                    return self.amount
-
-            elif self.repeat_pattern == "weekly":
-                return self.weekly_month(month, timedelta(weeks=1))
-
-            elif self.repeat_pattern == "every two weeks":
-                return self.weekly_month(month, timedelta(weeks=2))
-
-            elif self.repeat_pattern == "every three weeks":
-                return self.weekly_month(month, timedelta(weeks=3))
+    def __str__(self):
+        return f"{self.start} - {self.end}"
 
-            else:
-                return self.weekly_month(month, timedelta(weeks=4))
+    def covers(self, start: date, end: date) -> bool:
+        """Takes start and end date as arguments and returns True if all occurrences in between are materialized."""
+        return self.start <= start and end <= self.end
 
-    def weekly_month(self, month: int, delta: int) -> Union[int, float]:
-        """Takes month and delta (number of weeks in between repeats) as arguments and returns total amoount for transaction in a month if it has a 1/2/3/4-weekly repeat pattern"""
-        due_date = self.due_date
-        amount = 0
 
-        while due_date.month != month:
-            due_date += delta
+class MonthlySummary(models.Model):
+    """Model representing the stored income, expense and net totals of a user (group is None) or a group (user is None) for one month.
+    days holds the signed amounts (in cents) due on every day of the month, one list per day, if they were precomputed."""
+    user = models.ForeignKey(
+        MyUser, blank=True, null=True, default=None, on_delete=models.CASCADE
+    )
+    group = models.ForeignKey(
+        UserGroup, blank=True, null=True, default=None, on_delete=models.CASCADE
+    )
+    year = models.SmallIntegerField()
+    month = models.SmallIntegerField()
+    income = CentsField(default=0)
+    expense = CentsField(default=0)
+    net = CentsField(default=0)
+    days = models.JSONField(blank=True, null=True, default=None)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year", "month"],
+                condition=models.Q(group__isnull=True),
+                name="unique_user_monthly_summary",
+            ),
+            models.UniqueConstraint(
+                fields=["group", "year", "month"],
+                condition=models.Q(group__isnull=False),
+                name="unique_group_monthly_summary",
+            ),
+        ]
 
-        while due_date.month == month:
-            amount += self.amount
-            due_date += delta
+    def __str__(self):
+        return f"{self.group_id or self.user_id} {self.month}/{self.year}"
 
-        if self.transaction_type == "Expense":
-            return -amount
-        else:
-            return amount
+
+class RecomputeJob(models.Model):
+    """Model representing a pending recomputation of the derived data (occurrences and monthly summaries) of a user (group is None) or a group (user is None) from start to end.
+    There is at most one unclaimed job per owner, later writes widen its date range instead of adding jobs."""
+    user = models.ForeignKey(
+        MyUser, blank=True, null=True, default=None, on_delete=models.CASCADE
+    )
+    group = models.ForeignKey(
+        UserGroup, blank=True, null=True, default=None, on_delete=models.CASCADE
+    )
+    start = models.DateField()
+    end = models.DateField()
+    created = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(blank=True, null=True, default=None)
+
+    objects = OwnedQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(group__isnull=True, claimed_at__isnull=True),
+                name="unique_pending_user_job",
+            ),
+            models.UniqueConstraint(
+                fields=["group"],
+                condition=models.Q(group__isnull=False, claimed_at__isnull=True),
+                name="unique_pending_group_job",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["claimed_at", "created"], name="recompute_job_queue_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.group_id or self.user_id} {self.start} - {self.end}"
@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional, Tuple
+from django.conf import settings
+from django.db import transaction as db_transaction
+from .models import (
+    Transaction,
+    TransactionOccurrence,
+    OccurrenceHorizon,
+    add_months,
+    month_bounds,
+)
+
+BATCH_SIZE = 1000
+
+
+def horizon_bounds(today: Optional[date] = None) -> Tuple[date, date]:
+    """Return a tuple (start, end) of the rolling horizon around today's month as configured in the settings."""
+    today = today or date.today()
+    months_back = getattr(settings, "OCCURRENCE_HORIZON_MONTHS_BACK", 12)
+    months_ahead = getattr(settings, "OCCURRENCE_HORIZON_MONTHS_AHEAD", 36)
+    first_of_month = today.replace(day=1)
+    start = add_months(first_of_month, -months_back)
+    last = add_months(first_of_month, months_ahead)
+    return start, month_bounds(last.month, last.year)[1]
+
+
+def get_horizon() -> Optional[OccurrenceHorizon]:
+    """Return the stored occurrence horizon, or None if occurrences have never been materialized."""
+    return OccurrenceHorizon.objects.first()
+
+
+def is_materialized(start: date, end: date) -> bool:
+    """Takes start and end date as arguments and returns True if the occurrence table holds all occurrences in between."""
+    horizon = get_horizon()
+    return horizon is not None and horizon.covers(start, end)
+
+
+def build_occurrences(transaction: Transaction, start: date, end: date):
+    """Takes a transaction, start and end date as arguments and yields unsaved occurrences in between."""
+    for due_date, amount in transaction.dated_amounts(start, end):
+        yield TransactionOccurrence(
+            transaction_id=transaction.id,
+            user_id=transaction.user_id,
+            group_id=transaction.group_id,
+            date=due_date,
+            amount=amount,
+        )
+
+
+def materialize(transactions: Iterable[Transaction], start: date, end: date) -> int:
+    """Takes transactions, start and end date as arguments and inserts their occurrences in between in batches. Returns number of rows written."""
+    batch = []
+    written = 0
+    for transaction in transactions:
+        batch.extend(build_occurrences(transaction, start, end))
+        if len(batch) >= BATCH_SIZE:
+            TransactionOccurrence.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        TransactionOccurrence.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def active_transactions(start: date, end: date):
+    """Takes start and end date as arguments and returns a queryset of all transactions that may be due in between."""
+    return Transaction.objects.active_between(start, end)
+
+
+def refresh_transaction(transaction: Transaction):
+    """Takes a transaction as argument and replaces its materialized occurrences within the stored horizon."""
+    horizon = get_horizon()
+    if horizon is None:
+        return
+    with db_transaction.atomic():
+        TransactionOccurrence.objects.filter(transaction_id=transaction.id).delete()
+        materialize([transaction], horizon.start, horizon.end)
+
+
+def rebuild(today: Optional[date] = None) -> int:
+    """Delete all materialized occurrences and rebuild them for the horizon around today. Returns number of rows written."""
+    start, end = horizon_bounds(today)
+    with db_transaction.atomic():
+        TransactionOccurrence.objects.all().delete()
+        OccurrenceHorizon.objects.all().delete()
+        written = materialize(
+            active_transactions(start, end).iterator(chunk_size=BATCH_SIZE), start, end
+        )
+        OccurrenceHorizon.objects.create(start=start, end=end)
+    return written
+
+
+def extend_horizon(today: Optional[date] = None) -> int:
+    """Move the stored horizon forward to the horizon around today, materializing only the newly covered months and
+    dropping occurrences that fell out of it. Rebuilds from scratch if there is no usable horizon yet. Returns number of rows written.
+    """
+    horizon = get_horizon()
+    start, end = horizon_bounds(today)
+    if horizon is None or horizon.end < start or start < horizon.start:
+        return rebuild(today)
+
+    written = 0
+    with db_transaction.atomic():
+        TransactionOccurrence.objects.filter(date__lt=start).delete()
+        if end > horizon.end:
+            new_start = horizon.end + timedelta(days=1)
+            written = materialize(
+                active_transactions(new_start, end).iterator(chunk_size=BATCH_SIZE),
+                new_start,
+                end,
+            )
+        horizon.start = start
+        horizon.end = max(end, horizon.end)
+        horizon.save()
+    return written
@@ -0,0 +1,105 @@
+import base64
+import binascii
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import List, NamedTuple, Optional
+from django.db.models import Model, Q, QuerySet
+from django.http import Http404
+from .fields import fits_cents
+
+# Sort options of the list views: query parameter value -> (field, descending). The id breaks ties, so every key is unique.
+SORT_KEYS = {
+    "due_date": ("due_date", False),
+    "-due_date": ("due_date", True),
+    "amount": ("amount", False),
+    "-amount": ("amount", True),
+    "name": ("name", False),
+    "-name": ("name", True),
+}
+
+# Largest id the id column can store.
+MAX_ID = 2**63 - 1
+
+
+def parse_amount(value: str) -> Decimal:
+    """Takes the amount of a cursor as argument and returns it as Decimal. Raises ValueError if it is not finite or
+    does not fit the amount column."""
+    amount = Decimal(value)
+    if not fits_cents(amount):
+        raise ValueError(value)
+    return amount
+
+
+# Parses the sort field's value back from its JSON representation in a cursor.
+PARSERS = {"due_date": date.fromisoformat, "amount": parse_amount, "name": str}
+
+
+class KeysetPage(NamedTuple):
+    """One page of a keyset paginated queryset. next_cursor is None on the last page."""
+
+    items: List[Model]
+    sort: str
+    next_cursor: Optional[str]
+
+
+def encode_cursor(sort: str, item: Model) -> str:
+    """Takes a sort option and the last item of a page as arguments and returns the cursor of the following page."""
+    field, _ = SORT_KEYS[sort]
+    value = getattr(item, field)
+    payload = [sort, value.isoformat() if field == "due_date" else str(value), item.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(sort: str, cursor: str):
+    """Takes a sort option and a cursor as arguments and returns a tuple (value, id) of the item the previous page ended
+    with. Raises Http404 if the cursor is malformed, holds values the columns cannot store or was made for a different
+    sort option.
+    """
+    try:
+        cursor_sort, value, item_id = json.loads(base64.urlsafe_b64decode(cursor))
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        item_id = int(item_id)
+        if not 0 <= item_id <= MAX_ID:
+            raise ValueError(item_id)
+        return PARSERS[SORT_KEYS[sort][0]](value), item_id
+    except (ValueError, TypeError, InvalidOperation, binascii.Error):
+        raise Http404("Invalid cursor.")
+
+
+def keyset_queryset(queryset: QuerySet, sort: str, cursor: Optional[str]) -> QuerySet:
+    """Takes a queryset, a sort option and an optional cursor as arguments and returns the queryset ordered by the sort
+    option and limited to the items following the cursor. The items are selected with a range condition on
+    (sort field, id) instead of an OFFSET, so every page costs the same as the first one.
+    """
+    field, descending = SORT_KEYS[sort]
+    prefix = "-" if descending else ""
+    queryset = queryset.order_by(prefix + field, prefix + "id")
+    if cursor:
+        value, item_id = decode_cursor(sort, cursor)
+        # field >= value limits the index range, the second condition skips the rows of the previous pages.
+        after, at_or_after = ("lt", "lte") if descending else ("gt", "gte")
+        queryset = queryset.filter(**{f"{field}__{at_or_after}": value}).filter(
+            Q(**{f"{field}__{after}": value}) | Q(**{f"id__{after}": item_id})
+        )
+    return queryset
+
+
+def make_page(items: List[Model], sort: str, page_size: int) -> KeysetPage:
+    """Takes the items fetched for a page (up to one more than the page size), the sort option and the page size as
+    arguments and returns the KeysetPage."""
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(sort, items[-1])
+    return KeysetPage(items=items, sort=sort, next_cursor=next_cursor)
+
+
+def keyset_page(
+    queryset: QuerySet, sort: str, cursor: Optional[str], page_size: int
+) -> KeysetPage:
+    """Takes a queryset, a sort option, an optional cursor and a page size as arguments and returns the KeysetPage
+    following the cursor."""
+    queryset = keyset_queryset(queryset, sort, cursor)
+    return make_page(list(queryset[: page_size + 1]), sort, page_size)
@@ -0,0 +1,206 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import django
+from django.db import connections, transaction as db_transaction
+from django.db.models import Q
+from user.models import MyUser, UserGroup
+from .fields import cents, from_cents, to_cents
+from .models import (
+    MonthlySummary,
+    Transaction,
+    TransactionOccurrence,
+    add_months,
+    month_bounds,
+)
+from . import occurrences
+
+# Number of owners handed to a worker at once. Their transactions are read with one query per chunk.
+CHUNK_SIZE = 200
+READ_CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+OWNER_MODELS = {"user": MyUser, "group": UserGroup}
+
+
+class ChunkResult(NamedTuple):
+    """Precomputed months of one chunk of owners. versions holds the ledger version of every owner at the time it was
+    read, months a list of tuples (year, month, income, expense, days) per owner id, amounts in cents.
+    """
+
+    kind: str
+    versions: Dict[int, int]
+    months: Dict[int, List[Tuple[int, int, int, int, List[List[int]]]]]
+
+
+def month_starts(first: date, months: int) -> List[date]:
+    """Takes the first day of a month and a number of months as arguments and returns the first days of that many
+    consecutive months."""
+    return [add_months(first, offset) for offset in range(months)]
+
+
+def owner_chunks(
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Tuple[str, List[int]]]:
+    """Takes a chunk size as argument and yields tuples (kind, ids) covering every user and every group, with kind
+    being user or group."""
+    for kind, model in OWNER_MODELS.items():
+        ids = model.objects.order_by("id").values_list("id", flat=True)
+        ids = ids.iterator(chunk_size=READ_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(ids, chunk_size))
+            if not chunk:
+                break
+            yield kind, chunk
+
+
+def owned(kind: str, ids: List[int]) -> Dict:
+    """Takes an owner kind and owner ids as arguments and returns the filter selecting the ledgers of those owners."""
+    if kind == "group":
+        return {"group_id__in": ids}
+    return {"user_id__in": ids, "group__isnull": True}
+
+
+def dated_cents(
+    kind: str, ids: List[int], start: date, end: date
+) -> Iterator[Tuple[int, date, int]]:
+    """Takes an owner kind, owner ids, start and end date as arguments and yields a tuple (owner id, date, signed
+    amount in cents) for every time a transaction of those owners is due in between. Within a day the amounts are
+    ordered by transaction, like on the welcome page."""
+    owner_id = f"{kind}_id"
+    if occurrences.is_materialized(start, end):
+        rows = (
+            TransactionOccurrence.objects.filter(**owned(kind, ids))
+            .filter(date__range=(start, end))
+            .order_by(owner_id, "date", "transaction_id")
+            .values_list(owner_id, "date", cents("amount"))
+        )
+        yield from rows.iterator(chunk_size=READ_CHUNK_SIZE)
+        return
+
+    queryset = (
+        Transaction.objects.filter(**owned(kind, ids))
+        .active_between(start, end)
+        .order_by(owner_id, "id")
+    )
+    for transaction in queryset.iterator(chunk_size=READ_CHUNK_SIZE):
+        for due_date, amount in transaction.dated_amounts(start, end):
+            yield getattr(transaction, owner_id), due_date, to_cents(amount)
+
+
+def compute_chunk(kind: str, ids: List[int], first: date, months: int) -> ChunkResult:
+    """Takes an owner kind, owner ids, the first day of the first month and a number of months as arguments and returns
+    the ChunkResult of those owners. Runs in a worker process."""
+    starts = month_starts(first, months)
+    end = month_bounds(starts[-1].month, starts[-1].year)[1]
+    versions = dict(
+        OWNER_MODELS[kind]
+        .objects.filter(id__in=ids)
+        .values_list("id", "ledger_version")
+    )
+    index = {
+        (start.year, start.month): position for position, start in enumerate(starts)
+    }
+    days = {
+        owner: [
+            [[] for _ in range(month_bounds(start.month, start.year)[1].day)]
+            for start in starts
+        ]
+        for owner in versions
+    }
+    for owner, due_date, amount in dated_cents(kind, list(versions), first, end):
+        days[owner][index[due_date.year, due_date.month]][due_date.day - 1].append(
+            amount
+        )
+
+    results = {}
+    for owner, owner_days in days.items():
+        results[owner] = []
+        for start, month_days in zip(starts, owner_days):
+            amounts = [amount for day in month_days for amount in day]
+            income = sum(amount for amount in amounts if amount > 0)
+            expense = sum(amount for amount in amounts if amount < 0)
+            results[owner].append(
+                (start.year, start.month, income, expense, month_days)
+            )
+    return ChunkResult(kind, versions, results)
+
+
+def save_chunk(result: ChunkResult, first: date, months: int) -> int:
+    """Takes a ChunkResult, the first day of the first month and the number of months as arguments and replaces the
+    stored summaries of those owners and months with a few bulk queries. Owners whose ledger changed since the worker
+    read it are skipped, their summaries are computed on the next view instead. Returns number of rows written.
+    """
+    kind = result.kind
+    periods = Q()
+    for start in month_starts(first, months):
+        periods |= Q(year=start.year, month=start.month)
+
+    with db_transaction.atomic():
+        # Deleting first takes the write lock right away, SQLite fails to upgrade a read lock while another thread writes.
+        MonthlySummary.objects.filter(**owned(kind, list(result.versions))).filter(
+            periods
+        ).delete()
+        current = dict(
+            OWNER_MODELS[kind]
+            .objects.filter(id__in=list(result.versions))
+            .values_list("id", "ledger_version")
+        )
+        owners = [
+            owner
+            for owner, version in result.versions.items()
+            if current.get(owner) == version
+        ]
+        summaries = [
+            MonthlySummary(
+                **{f"{kind}_id": owner},
+                year=year,
+                month=month,
+                income=from_cents(income),
+                expense=from_cents(expense),
+                net=from_cents(income + expense),
+                days=days,
+            )
+            for owner in owners
+            for year, month, income, expense, days in result.months[owner]
+        ]
+        MonthlySummary.objects.bulk_create(
+            summaries, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+    return len(owners)
+
+
+def setup_worker():
+    """Initializer of the worker processes. Sets up Django in processes that were not forked from a ready one."""
+    django.setup()
+
+
+def precompute(
+    months: int,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    first: Optional[date] = None,
+) -> int:
+    """Takes a number of months, a number of worker processes, a chunk size and the first day of the first month
+    (default this month) as arguments and stores the monthly totals and day amounts of every user and group for those
+    months. Chunks of owners are computed in parallel, the results are written by this process. Returns number of
+    owners written."""
+    first = (first or date.today()).replace(day=1)
+    written = 0
+    if workers == 1:
+        for kind, ids in owner_chunks(chunk_size):
+            written += save_chunk(
+                compute_chunk(kind, ids, first, months), first, months
+            )
+        return written
+
+    chunks = list(owner_chunks(chunk_size))
+    # Forked workers must not share this process' database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker) as pool:
+        futures = [
+            pool.submit(compute_chunk, kind, ids, first, months) for kind, ids in chunks
+        ]
+        for future in futures:
+            written += save_chunk(future.result(), first, months)
+    return written
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from user.models import bump_ledger_version
+from .models import Transaction, TransactionOccurrence
+from . import jobs, occurrences, summaries
+
+
+@receiver(post_save, sender=Transaction)
+def update_occurrences(sender, instance, **kwargs):
+    """Rematerialize occurrences of a transaction whenever it is saved. Deleted transactions lose their occurrences through the cascade.
+    With RECOMPUTE_IN_BACKGROUND only the outdated occurrences are dropped, the recompute worker materializes the new ones.
+    """
+    if settings.RECOMPUTE_IN_BACKGROUND:
+        TransactionOccurrence.objects.filter(transaction_id=instance.id).delete()
+    else:
+        occurrences.refresh_transaction(instance)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def enqueue_recompute(sender, instance, **kwargs):
+    """Schedule the recomputation of the months a transaction affects whenever it is saved or deleted, if derived data
+    is recomputed in the background."""
+    if settings.RECOMPUTE_IN_BACKGROUND:
+        jobs.enqueue_transaction(instance)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_summaries(sender, instance, **kwargs):
+    """Delete the stored monthly summaries of the owner of a transaction whenever it is saved or deleted."""
+    summaries.invalidate(instance.user_id, instance.group_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_version(sender, instance, **kwargs):
+    """Increment the ledger version of the owner of a transaction whenever it is saved or deleted."""
+    bump_ledger_version(instance.user_id, instance.group_id)
@@ -0,0 +1,122 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q, Sum
+from user.models import MyUser
+from .models import (
+    MonthlySummary,
+    RecomputeJob,
+    Transaction,
+    TransactionOccurrence,
+    month_bounds,
+)
+from . import engine, occurrences
+
+
+def owner_of(user: MyUser) -> Dict:
+    """Takes a user as argument and returns the owner fields {user, group} of the ledger the user currently acts on."""
+    group = user.get_active_group()
+    if group is not None:
+        return {"user": None, "group": group}
+    return {"user": user, "group": None}
+
+
+def recompute_pending(user: MyUser, month: int, year: int) -> bool:
+    """Takes a user, month and year as arguments and returns True if a pending or claimed RecomputeJob of the ledger the
+    user acts on covers the month, i.e. its occurrences may be outdated."""
+    start, end = month_bounds(month, year)
+    return (
+        RecomputeJob.objects.owned_by(user)
+        .filter(start__lte=end, end__gte=start)
+        .exists()
+    )
+
+
+def compute_month(user: MyUser, month: int, year: int) -> Tuple[Decimal, Decimal]:
+    """Takes a user, month and year as arguments and returns a tuple (income, expense) of the ledger the user acts on.
+    Sums the materialized occurrences if they cover the month and no recomputation of it is pending, aggregates in the
+    database otherwise.
+    """
+    start, end = month_bounds(month, year)
+    if occurrences.is_materialized(start, end) and not recompute_pending(
+        user, month, year
+    ):
+        totals = (
+            TransactionOccurrence.objects.owned_by(user)
+            .filter(date__range=(start, end))
+            .aggregate(
+                income=Sum("amount", filter=Q(amount__gt=0)),
+                expense=Sum("amount", filter=Q(amount__lt=0)),
+            )
+        )
+        return totals["income"] or Decimal("0.00"), totals["expense"] or Decimal("0.00")
+
+    queryset = Transaction.objects.owned_by(user).active_between(start, end)
+    return engine.month_totals(queryset, month, year)
+
+
+def ledger_version(user: MyUser) -> Optional[int]:
+    """Takes a user as argument and returns the current ledger version of the ledger the user acts on, read from the
+    database."""
+    ledger = user.get_ledger_owner()
+    return (
+        type(ledger)
+        .objects.filter(pk=ledger.pk)
+        .values_list("ledger_version", flat=True)
+        .first()
+    )
+
+
+def get_month_summary(user: MyUser, month: int, year: int) -> MonthlySummary:
+    """Takes a user, month and year as arguments and returns the stored MonthlySummary of the ledger the user acts on,
+    computing and storing it first if there is none. The computed summary is only stored if the ledger did not change
+    while it was computed and no recomputation of the month is pending (in background mode a write bumps the version
+    before the recompute worker materializes its occurrences)."""
+    owner = owner_of(user)
+    summary = MonthlySummary.objects.filter(**owner, year=year, month=month).first()
+    if summary is not None:
+        return summary
+
+    version = ledger_version(user)
+    income, expense = compute_month(user, month, year)
+    summary = MonthlySummary(
+        **owner,
+        year=year,
+        month=month,
+        income=income,
+        expense=expense,
+        net=income + expense
+    )
+    if recompute_pending(user, month, year):
+        return summary
+    try:
+        with db_transaction.atomic():
+            # Saving first takes the write lock right away, SQLite fails to upgrade a read lock while another thread writes.
+            summary.save()
+            if ledger_version(user) != version:
+                # A write committed while the month was computed, the summary is computed again on the next view.
+                db_transaction.set_rollback(True)
+                summary.pk = None
+    except IntegrityError:
+        # Another request stored the same month in the meantime.
+        pass
+    return summary
+
+
+def stored_days(user: MyUser, month: int, year: int) -> Optional[List[List[int]]]:
+    """Takes a user, month and year as arguments and returns the precomputed amounts (in cents) due on every day of that
+    month for the ledger the user acts on, one list per day. Returns None if they were not precomputed.
+    """
+    return (
+        MonthlySummary.objects.filter(**owner_of(user), year=year, month=month)
+        .values_list("days", flat=True)
+        .first()
+    )
+
+
+def invalidate(user_id: int, group_id: Optional[int]):
+    """Takes the owner fields of a transaction as arguments and deletes all stored summaries of that user or group."""
+    if group_id is not None:
+        MonthlySummary.objects.filter(group_id=group_id).delete()
+    else:
+        MonthlySummary.objects.filter(user_id=user_id, group__isnull=True).delete()
@@ -0,0 +1,135 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Optional, Sequence, Tuple
+from django.contrib.auth.hashers import make_password
+from django.db import transaction as db_transaction
+from user.models import MyUser, UserGroup
+from .models import Transaction
+from . import occurrences
+
+BATCH_SIZE = 5000
+PASSWORD = "synthetic"
+
+TYPES = [value for value, _ in Transaction.types]
+PATTERNS = [value for value, _ in Transaction.repeat_patterns]
+# Relative frequency of the transaction types and the amount range (in cents) drawn for each.
+TYPE_WEIGHTS = {"Income": 3, "Expense": 6, "Loan": 1}
+AMOUNTS = {
+    "Income": (5_000, 500_000),
+    "Expense": (100, 150_000),
+    "Loan": (100_000, 5_000_000),
+}
+NAMES = {
+    "Income": ("Salary", "Freelance", "Dividends", "Rent income", "Refund"),
+    "Expense": ("Rent", "Groceries", "Insurance", "Phone", "Gym", "Streaming", "Fuel"),
+    "Loan": ("Mortgage", "Car loan", "Student loan", "Consumer credit"),
+}
+
+
+def create_owners(
+    users: int, groups: int, members: int, prefix: str, password: str = PASSWORD
+) -> Tuple[List[MyUser], List[UserGroup]]:
+    """Takes numbers of users, groups and members per group, a name prefix and a password as arguments and creates the
+    users and the groups (all with that password), each group with randomly chosen members. Returns a tuple (users,
+    groups)."""
+    hashed = make_password(password)
+    created_users = MyUser.objects.bulk_create(
+        (MyUser(username=f"{prefix}-{i}", password=hashed) for i in range(users)),
+        batch_size=BATCH_SIZE,
+    )
+    created_groups = UserGroup.objects.bulk_create(
+        (
+            UserGroup(
+                name=f"{prefix}-{i}",
+                password=hashed,
+                nr_of_members=min(members, users),
+            )
+            for i in range(groups)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    Membership = UserGroup.members.through
+    Membership.objects.bulk_create(
+        (
+            Membership(usergroup_id=group.id, myuser_id=user.id)
+            for group in created_groups
+            for user in random.sample(created_users, min(members, users))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    return created_users, created_groups
+
+
+def random_transaction(
+    user: MyUser, group: Optional[UserGroup], first: date, days: int
+) -> Transaction:
+    """Takes the owner fields, the first possible due date and the number of days due dates are spread over as
+    arguments and returns an unsaved random transaction. Loans get an amortization term, some transactions an end
+    date."""
+    transaction_type = random.choices(TYPES, [TYPE_WEIGHTS[t] for t in TYPES])[0]
+    due_date = first + timedelta(days=random.randrange(days))
+    end_date = None
+    if random.random() < 0.25:
+        end_date = due_date + timedelta(days=random.randrange(30, 1500))
+    loan = transaction_type == "Loan"
+    return Transaction(
+        user=user,
+        group=group,
+        transaction_type=transaction_type,
+        name=random.choice(NAMES[transaction_type]),
+        purpose="synthetic",
+        amount=Decimal(random.randrange(*AMOUNTS[transaction_type])).scaleb(-2),
+        due_date=due_date,
+        repeat_pattern="monthly" if loan else random.choice(PATTERNS),
+        end_date=end_date,
+        interest_rate=Decimal(random.randrange(100, 900)).scaleb(-2) if loan else None,
+        term_months=random.choice((12, 36, 60, 120, 360)) if loan else None,
+    )
+
+
+def random_transactions(
+    users: Sequence[MyUser],
+    groups: Sequence[UserGroup],
+    per_owner: int,
+    first: date,
+    years: int,
+) -> Iterator[Transaction]:
+    """Takes users, groups, a number of transactions per ledger, the first possible due date and the number of years
+    due dates are spread over as arguments and yields unsaved random transactions for every user's and every group's
+    ledger. Group transactions are entered by one of the group's members."""
+    days = max(years * 365, 1)
+    for user in users:
+        for _ in range(per_owner):
+            yield random_transaction(user, None, first, days)
+    for group in groups:
+        members = list(group.members.all()) or list(users[:1])
+        for _ in range(per_owner):
+            yield random_transaction(random.choice(members), group, first, days)
+
+
+def save(transactions: Iterator[Transaction], batch_size: int = BATCH_SIZE) -> int:
+    """Takes unsaved transactions and a batch size as arguments and inserts them in batches. bulk_create does not send
+    signals, so the occurrences of the new transactions are materialized here if there is a horizon. Returns number of
+    rows written."""
+    horizon = occurrences.get_horizon()
+    written = 0
+    batch = []
+    for transaction in transactions:
+        batch.append(transaction)
+        if len(batch) >= batch_size:
+            written += save_batch(batch, horizon)
+            batch = []
+    return written + save_batch(batch, horizon)
+
+
+def save_batch(batch: List[Transaction], horizon) -> int:
+    """Takes unsaved transactions and the occurrence horizon (or None) as arguments and inserts them with their
+    occurrences. Returns number of rows written."""
+    if not batch:
+        return 0
+    with db_transaction.atomic():
+        created = Transaction.objects.bulk_create(batch)
+        if horizon is not None:
+            occurrences.materialize(created, horizon.start, horizon.end)
+    return len(created)
@@ -1 +1,693 @@
-from django.test import TestCase
+import base64
+import calendar
+import io
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from user.models import MyUser, bump_ledger_version
+from .loans import amortize
+from .models import (
+    MonthlySummary,
+    RecomputeJob,
+    Transaction,
+    TransactionOccurrence,
+    WEEKLY_PATTERNS,
+    month_bounds,
+)
+from .pagination import SORT_KEYS, decode_cursor, keyset_page
+from . import engine, imports, jobs, occurrences, precompute, summaries
+
+# Repeat patterns with a due date on the 31st, so monthly occurrences are clamped in shorter months, and end dates
+# before, inside and after the checked months.
+DUE_DATE = date(2023, 1, 31)
+END_DATES = (
+    None,
+    date(2022, 12, 1),
+    date(2023, 1, 31),
+    date(2023, 4, 29),
+    date(2024, 2, 28),
+)
+MONTHS = [(month, year) for year in (2022, 2023, 2024) for month in range(1, 13)]
+
+
+def brute_force_count(transaction: Transaction, start: date, end: date) -> int:
+    """Count the days from start to end on which the transaction is due by checking every single day."""
+    count = 0
+    day = start
+    while day <= end:
+        due = transaction.due_date
+        if day >= due and (transaction.end_date is None or day <= transaction.end_date):
+            weeks = WEEKLY_PATTERNS.get(transaction.repeat_pattern)
+            if weeks is not None:
+                count += (day - due).days % (weeks * 7) == 0
+            elif transaction.repeat_pattern == "monthly":
+                count += day.day == min(
+                    due.day, calendar.monthrange(day.year, day.month)[1]
+                )
+            else:
+                count += day == due
+        day += timedelta(days=1)
+    return count
+
+
+class PatternTestCase(TestCase):
+    """Transactions of every repeat pattern, due on the 31st, with end dates before, inside and after the checked
+    months."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("equivalence", password="pw")
+        for pattern, _ in Transaction.repeat_patterns:
+            for end_date in END_DATES:
+                Transaction.objects.create(
+                    user=cls.user,
+                    transaction_type="Expense" if end_date else "Income",
+                    name=pattern,
+                    purpose="test",
+                    amount=Decimal("12.34"),
+                    due_date=DUE_DATE,
+                    repeat_pattern=pattern,
+                    end_date=end_date,
+                )
+
+
+class OccurrenceTest(PatternTestCase):
+    """The closed form occurrences agree with a day by day count."""
+
+    def test_closed_form_matches_brute_force(self):
+        for transaction in Transaction.objects.all():
+            for month, year in MONTHS:
+                start, end = month_bounds(month, year)
+                expected = brute_force_count(transaction, start, end)
+                with self.subTest(
+                    transaction.repeat_pattern,
+                    end_date=transaction.end_date,
+                    month=(month, year),
+                ):
+                    self.assertEqual(transaction.occurrence_count(start, end), expected)
+                    self.assertEqual(len(transaction.occurrences(start, end)), expected)
+                    self.assertEqual(
+                        transaction.monthamount(month, year),
+                        expected * transaction.signed_amount,
+                    )
+
+
+class OccurrenceMaterializationTest(TestCase):
+    """Writing a transaction replaces its materialized occurrences within the horizon."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("materialize", password="pw")
+        occurrences.rebuild(today=date(2024, 1, 15))
+        cls.horizon = occurrences.get_horizon()
+
+    def stored(self, transaction):
+        """Return tuples (date, amount) of the stored occurrences of a transaction."""
+        return list(
+            TransactionOccurrence.objects.filter(transaction_id=transaction.id)
+            .order_by("date")
+            .values_list("date", "amount")
+        )
+
+    def expected(self, transaction):
+        """Return tuples (date, amount) of the occurrences of a transaction within the horizon."""
+        return transaction.dated_amounts(self.horizon.start, self.horizon.end)
+
+    def test_write_materializes_occurrences(self):
+        transaction = Transaction.objects.create(
+            user=self.user,
+            transaction_type="Expense",
+            name="Rent",
+            purpose="test",
+            amount=Decimal("500.00"),
+            due_date=date(2024, 1, 31),
+            repeat_pattern="monthly",
+        )
+        self.assertEqual(len(self.stored(transaction)), 37)
+        self.assertEqual(self.stored(transaction), self.expected(transaction))
+
+        transaction.amount = Decimal("550.00")
+        transaction.repeat_pattern = "every two weeks"
+        transaction.end_date = date(2024, 6, 30)
+        transaction.save()
+        self.assertEqual(self.stored(transaction), self.expected(transaction))
+        self.assertEqual(
+            self.stored(transaction)[0], (date(2024, 1, 31), Decimal("-550.00"))
+        )
+
+        transaction_id = transaction.id
+        transaction.delete()
+        self.assertFalse(
+            TransactionOccurrence.objects.filter(transaction_id=transaction_id).exists()
+        )
+
+
+class EngineTest(PatternTestCase):
+    """The NumPy engine agrees with a day by day count."""
+
+    def test_engine_matches_brute_force(self):
+        transactions = list(Transaction.objects.order_by("id"))
+        batch = engine.load_batch(Transaction.objects.order_by("id"))
+        months = np.array(
+            [f"{year:04d}-{month:02d}" for month, year in MONTHS], dtype="datetime64[M]"
+        )
+        counts = engine.month_counts(batch, months)
+        for row, transaction in enumerate(transactions):
+            for column, (month, year) in enumerate(MONTHS):
+                with self.subTest(
+                    transaction.repeat_pattern,
+                    end_date=transaction.end_date,
+                    month=(month, year),
+                ):
+                    self.assertEqual(
+                        counts[row, column],
+                        brute_force_count(transaction, *month_bounds(month, year)),
+                    )
+
+
+class MonthSumsTest(PatternTestCase):
+    """The SQL aggregate and the month totals agree with a day by day count and the closed form."""
+
+    def test_sql_matches_brute_force(self):
+        queryset = Transaction.objects.filter(repeat_pattern__in=("one off", "monthly"))
+        for month, year in MONTHS:
+            start, end = month_bounds(month, year)
+            expected = {"income": Decimal("0.00"), "expense": Decimal("0.00")}
+            for transaction in queryset:
+                key = (
+                    "income" if transaction.transaction_type == "Income" else "expense"
+                )
+                expected[key] += (
+                    brute_force_count(transaction, start, end)
+                    * transaction.signed_amount
+                )
+            with self.subTest(month=(month, year)):
+                self.assertEqual(queryset.month_sums(month, year), expected)
+
+    def test_month_totals_match_closed_form(self):
+        queryset = Transaction.objects.owned_by(self.user)
+        for month, year in MONTHS:
+            income, expense = engine.month_totals(queryset, month, year)
+            with self.subTest(month=(month, year)):
+                self.assertEqual(
+                    income + expense, sum(t.monthamount(month, year) for t in queryset)
+                )
+
+
+class MonthSummaryTest(TestCase):
+    """get_month_summary stores the computed month unless the ledger changed while it was computed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("summary", password="pw")
+
+    def test_summary_is_stored(self):
+        summary = summaries.get_month_summary(self.user, 1, 2024)
+        self.assertIsNotNone(summary.pk)
+        self.assertEqual(MonthlySummary.objects.owned_by(self.user).count(), 1)
+
+    def test_writes_invalidate_summaries(self):
+        self.assertEqual(summaries.get_month_summary(self.user, 1, 2024).net, 0)
+        transaction = Transaction.objects.create(
+            user=self.user,
+            transaction_type="Income",
+            name="Salary",
+            purpose="test",
+            amount=Decimal("100.00"),
+            due_date=date(2024, 1, 15),
+        )
+        self.assertFalse(MonthlySummary.objects.owned_by(self.user).exists())
+        self.assertEqual(
+            summaries.get_month_summary(self.user, 1, 2024).net, Decimal("100.00")
+        )
+
+        transaction.amount = Decimal("80.00")
+        transaction.save()
+        self.assertFalse(MonthlySummary.objects.owned_by(self.user).exists())
+        self.assertEqual(
+            summaries.get_month_summary(self.user, 1, 2024).net, Decimal("80.00")
+        )
+
+        transaction.delete()
+        self.assertFalse(MonthlySummary.objects.owned_by(self.user).exists())
+        self.assertEqual(summaries.get_month_summary(self.user, 1, 2024).net, 0)
+
+    def test_stale_summary_is_not_stored(self):
+        compute_month = summaries.compute_month
+
+        def concurrent_write(user, month, year):
+            totals = compute_month(user, month, year)
+            bump_ledger_version(user.id)
+            return totals
+
+        with mock.patch.object(summaries, "compute_month", concurrent_write):
+            summary = summaries.get_month_summary(self.user, 1, 2024)
+        self.assertIsNone(summary.pk)
+        self.assertEqual(summary.net, Decimal("0.00"))
+        self.assertFalse(MonthlySummary.objects.owned_by(self.user).exists())
+
+
+class PrecomputeTest(TestCase):
+    """save_chunk stores the precomputed months unless the owner's ledger changed after the chunk was computed."""
+
+    first = date(2024, 1, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("precompute", password="pw")
+        Transaction.objects.create(
+            user=cls.user,
+            transaction_type="Expense",
+            name="Rent",
+            purpose="test",
+            amount=Decimal("500.00"),
+            due_date=date(2023, 12, 31),
+            repeat_pattern="monthly",
+        )
+
+    def test_chunk_is_saved(self):
+        result = precompute.compute_chunk("user", [self.user.id], self.first, 2)
+        self.assertEqual(precompute.save_chunk(result, self.first, 2), 1)
+        stored = MonthlySummary.objects.owned_by(self.user).order_by("month")
+        self.assertEqual(
+            [(s.month, s.net) for s in stored],
+            [(1, Decimal("-500.00")), (2, Decimal("-500.00"))],
+        )
+        self.assertEqual(stored[1].days[28], [-50000])
+        self.assertEqual(
+            stored[0].net, sum(summaries.compute_month(self.user, 1, 2024))
+        )
+
+    def test_stale_chunk_is_skipped(self):
+        result = precompute.compute_chunk("user", [self.user.id], self.first, 2)
+        bump_ledger_version(self.user.id)
+        self.assertEqual(precompute.save_chunk(result, self.first, 2), 0)
+        self.assertFalse(MonthlySummary.objects.owned_by(self.user).exists())
+
+
+def make_cursor(*payload) -> str:
+    """Encode a cursor payload the way pagination.encode_cursor does."""
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class RecomputeJobTest(TestCase):
+    """Writes in background mode coalesce into one pending job per owner, which the worker claims, releases when stale
+    and runs. Months with a pending job are computed from the transactions and not stored.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("jobs", password="pw")
+        cls.other = MyUser.objects.create_user("other-jobs", password="pw")
+        occurrences.rebuild(today=date(2024, 1, 15))
+
+    def ranges(self):
+        """Return tuples (user id, start, end, claimed) of all jobs."""
+        return sorted(
+            (job.user_id, job.start, job.end, job.claimed_at is not None)
+            for job in RecomputeJob.objects.all()
+        )
+
+    def test_enqueue_widens_pending_job(self):
+        jobs.enqueue(self.user.id, None, date(2024, 3, 1), date(2024, 3, 31))
+        jobs.enqueue(self.user.id, None, date(2024, 1, 1), date(2024, 1, 31))
+        jobs.enqueue(self.user.id, None, date(2024, 2, 1), date(2024, 5, 31))
+        self.assertEqual(
+            self.ranges(), [(self.user.id, date(2024, 1, 1), date(2024, 5, 31), False)]
+        )
+
+    def test_claim_skips_owners_with_a_claimed_job(self):
+        jobs.enqueue(self.user.id, None, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+        # A write during the run gets a new pending job, claimed only after the running one is done.
+        jobs.enqueue(self.user.id, None, date(2024, 2, 1), date(2024, 2, 29))
+        jobs.enqueue(self.other.id, None, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual([job.user_id for job in jobs.claim(10)], [self.other.id])
+        self.assertEqual(
+            self.ranges(),
+            [
+                (self.user.id, date(2024, 1, 1), date(2024, 1, 31), True),
+                (self.user.id, date(2024, 2, 1), date(2024, 2, 29), False),
+                (self.other.id, date(2024, 1, 1), date(2024, 1, 31), True),
+            ],
+        )
+
+    def test_release_stale_merges_into_pending_job(self):
+        jobs.enqueue(self.user.id, None, date(2024, 1, 1), date(2024, 1, 31))
+        jobs.claim(1)
+        jobs.enqueue(self.user.id, None, date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual(jobs.release_stale(timedelta(hours=1)), 0)
+
+        RecomputeJob.objects.filter(claimed_at__isnull=False).update(
+            claimed_at=timezone.now() - timedelta(hours=2)
+        )
+        self.assertEqual(jobs.release_stale(timedelta(hours=1)), 1)
+        self.assertEqual(
+            self.ranges(), [(self.user.id, date(2024, 1, 1), date(2024, 3, 31), False)]
+        )
+        self.assertEqual(len(jobs.claim(1)), 1)
+
+    @override_settings(RECOMPUTE_IN_BACKGROUND=True)
+    def test_run_recomputes_owner(self):
+        transaction = Transaction.objects.create(
+            user=self.user,
+            transaction_type="Income",
+            name="Salary",
+            purpose="test",
+            amount=Decimal("100.00"),
+            due_date=date(2024, 1, 15),
+            repeat_pattern="monthly",
+        )
+        self.assertFalse(TransactionOccurrence.objects.exists())
+
+        # The month is computed from the transactions but not stored while the job is pending or claimed.
+        self.assertEqual(
+            summaries.get_month_summary(self.user, 2, 2024).net, Decimal("100.00")
+        )
+        job = jobs.claim(1)[0]
+        self.assertIsNone(summaries.get_month_summary(self.user, 2, 2024).pk)
+        self.assertFalse(MonthlySummary.objects.exists())
+
+        version = MyUser.objects.get(id=self.user.id).ledger_version
+        jobs.run(job, today=date(2024, 1, 15))
+        self.assertFalse(RecomputeJob.objects.exists())
+        self.assertEqual(
+            len(TransactionOccurrence.objects.filter(transaction=transaction)), 37
+        )
+        self.assertEqual(
+            MyUser.objects.get(id=self.user.id).ledger_version, version + 1
+        )
+        self.assertEqual(
+            list(
+                MonthlySummary.objects.owned_by(self.user)
+                .order_by("month")
+                .values_list("month", "net")
+            ),
+            [(month, Decimal("100.00")) for month in (1, 2, 3)],
+        )
+        self.assertIsNotNone(summaries.get_month_summary(self.user, 4, 2024).pk)
+
+
+class KeysetPaginationTest(TestCase):
+    """Following the cursors visits every transaction once in sort order, tampered cursors are answered with 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("pagination", password="pw")
+        for i in range(7):
+            Transaction.objects.create(
+                user=cls.user,
+                name=f"expense {i % 3}",
+                purpose="test",
+                amount=Decimal(i % 4) + Decimal("0.50"),
+                due_date=date(2024, 1, 1 + i % 2),
+            )
+
+    def test_cursors_round_trip(self):
+        queryset = Transaction.objects.owned_by(self.user)
+        for sort, (field, descending) in SORT_KEYS.items():
+            ids = []
+            cursor = None
+            while True:
+                page = keyset_page(queryset, sort, cursor, 3)
+                ids += [item.id for item in page.items]
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+                self.assertEqual(
+                    decode_cursor(sort, cursor),
+                    (getattr(page.items[-1], field), page.items[-1].id),
+                )
+            prefix = "-" if descending else ""
+            expected = queryset.order_by(prefix + field, prefix + "id")
+            with self.subTest(sort):
+                self.assertEqual(ids, [item.id for item in expected])
+
+    def test_tampered_cursors_are_rejected(self):
+        cursors = [
+            make_cursor("amount", "NaN", 1),
+            make_cursor("amount", "sNaN", 1),
+            make_cursor("amount", "Infinity", 1),
+            make_cursor("amount", "1e30", 1),
+            make_cursor("amount", "1e999999", 1),
+            make_cursor("amount", "1.50", 2**63),
+            make_cursor("amount", "1.50", -1),
+            make_cursor("due_date", "1.50", 1),
+            "not a cursor",
+        ]
+        self.client.force_login(self.user)
+        for cursor in cursors:
+            with self.subTest(cursor):
+                with self.assertRaises(Http404):
+                    decode_cursor("amount", cursor)
+                response = self.client.get(
+                    reverse("expenses"), {"sort": "amount", "cursor": cursor}
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class ImportTest(TestCase):
+    """Statement rows become one off transactions, invalid rows are reported without losing the valid ones."""
+
+    csv = (
+        "date,amount,payee,memo\n"
+        "2024-01-15,-12.34,Grocer,Food\n"
+        "2024-01-16,twelve,Grocer,Food\n"
+        "2024-01-17,1e20,Bank,Too much\n"
+        "2024-01-18,NaN,Bank,Not a number\n"
+        '2024-01-19,"1,500.00",Employer,Salary\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("import", password="pw")
+
+    def test_rows_are_validated(self):
+        transactions, errors = imports.validate(
+            imports.parse(io.StringIO(self.csv), "csv"), self.user, None
+        )
+        self.assertEqual(
+            [(t.transaction_type, t.name, t.amount, t.due_date) for t in transactions],
+            [
+                ("Expense", "Grocer", Decimal("12.34"), date(2024, 1, 15)),
+                ("Income", "Employer", Decimal("1500.00"), date(2024, 1, 19)),
+            ],
+        )
+        self.assertEqual([number for number, _ in errors], [3, 4, 5])
+        self.assertTrue(all("Invalid amount" in message for _, message in errors))
+
+    def test_out_of_range_row_keeps_the_batch(self):
+        reports = list(
+            imports.import_transactions(io.StringIO(self.csv), "csv", self.user)
+        )
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(reports[0].created, 2)
+        self.assertEqual(reports[0].error_count, 3)
+        self.assertEqual(Transaction.objects.owned_by(self.user).count(), 2)
+
+    @override_settings(RECOMPUTE_IN_BACKGROUND=True)
+    def test_background_import_enqueues_recompute(self):
+        occurrences.rebuild(today=date(2024, 1, 15))
+        list(imports.import_transactions(io.StringIO(self.csv), "csv", self.user))
+        self.assertFalse(TransactionOccurrence.objects.exists())
+        job = RecomputeJob.objects.get()
+        self.assertEqual(
+            (job.user_id, job.group_id, job.start, job.end),
+            (self.user.id, None, date(2024, 1, 1), date(2024, 1, 31)),
+        )
+        jobs.run(jobs.claim(1)[0], today=date(2024, 1, 15))
+        self.assertEqual(TransactionOccurrence.objects.count(), 2)
+
+
+class MonthUrlTest(TestCase):
+    """Pages of a month answer a month year integer that is not a valid month with 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("months", password="pw")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_invalid_months_are_not_found(self):
+        for name in ("balance", "projection", "timeline"):
+            for monthyear in (0, 5, 2024, 132024, 1999, 19999, 120999):
+                with self.subTest(name, monthyear=monthyear):
+                    response = self.client.get(reverse(name, args=[monthyear]))
+                    self.assertEqual(response.status_code, 404)
+
+    def test_valid_months_are_shown(self):
+        for name in ("balance", "projection", "timeline"):
+            for monthyear in (12024, 122024, 11000):
+                with self.subTest(name, monthyear=monthyear):
+                    response = self.client.get(reverse(name, args=[monthyear]))
+                    self.assertEqual(response.status_code, 200)
+
+
+class TimelineTest(TestCase):
+    """The timeline starts from the opening query parameter, invalid or too large values fall back to 0."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("timeline", password="pw")
+        Transaction.objects.create(
+            user=cls.user,
+            transaction_type="Expense",
+            name="Rent",
+            purpose="test",
+            amount=Decimal("500.00"),
+            due_date=date(2024, 1, 31),
+            repeat_pattern="monthly",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def closing(self, opening):
+        """Request the January 2024 timeline with an opening balance and return its closing balance."""
+        response = self.client.get(
+            reverse("timeline", args=[12024]), {"opening": opening}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.context["closing"]
+
+    def test_opening_balance(self):
+        self.assertEqual(self.closing("1000"), Decimal("500.00"))
+        self.assertEqual(self.closing("-1e3"), Decimal("-1500.00"))
+
+    def test_invalid_opening_falls_back_to_zero(self):
+        for opening in (
+            "abc",
+            "NaN",
+            "sNaN",
+            "Infinity",
+            "1e20",
+            "-1e17",
+            "1e999999",
+            "92233720368547758.07",
+        ):
+            with self.subTest(opening):
+                self.assertEqual(self.closing(opening), Decimal("-500.00"))
+
+
+class CreateTransactionTest(TestCase):
+    """The create form stores amounts as cents and rejects amounts whose cents do not fit the column."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("create", password="pw")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, amount):
+        """Post the create form with an amount and return the response."""
+        return self.client.post(
+            reverse("create"),
+            {
+                "transaction_type": "Expense",
+                "name": "Rent",
+                "purpose": "test",
+                "amount": amount,
+                "due_date": "2024-01-31",
+                "repeat_pattern": "monthly",
+            },
+        )
+
+    def test_amount_is_stored(self):
+        self.assertEqual(self.post("12.34").status_code, 302)
+        self.assertEqual(
+            Transaction.objects.owned_by(self.user).get().amount, Decimal("12.34")
+        )
+
+    def test_too_large_amount_is_a_form_error(self):
+        for amount in ("1e17", "-1e17", "1e20", "1e30"):
+            with self.subTest(amount):
+                response = self.post(amount)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("amount", response.context["form"].errors)
+        self.assertFalse(Transaction.objects.owned_by(self.user).exists())
+
+
+class MonthApiTest(TestCase):
+    """The JSON endpoints of a month answer invalid months with 404 and repeat requests with 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("api", password="pw")
+        Transaction.objects.create(
+            user=cls.user,
+            transaction_type="Income",
+            name="Salary",
+            purpose="test",
+            amount=Decimal("100.00"),
+            due_date=date(2024, 1, 31),
+            repeat_pattern="monthly",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_invalid_months_are_not_found(self):
+        for name in ("api_month", "api_days"):
+            for monthyear in (0, 5, 2024, 132024):
+                with self.subTest(name, monthyear=monthyear):
+                    response = self.client.get(reverse(name, args=[monthyear]))
+                    self.assertEqual(response.status_code, 404)
+
+    def test_month_totals(self):
+        response = self.client.get(reverse("api_month", args=[22024]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "month": 2,
+                "year": 2024,
+                "income": "100.00",
+                "expense": "0.00",
+                "net": "100.00",
+            },
+        )
+        days = self.client.get(reverse("api_days", args=[22024])).json()["days"]
+        self.assertEqual(len(days), 29)
+        self.assertEqual(days[28], {"date": "2024-02-29", "amount": "100.00"})
+
+    def test_repeat_request_is_not_modified(self):
+        url = reverse("api_month", args=[22024])
+        etag = self.client.get(url).headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+
+class AmortizeTest(TestCase):
+    """amortize returns the known annuity schedule, the last repayment clears the rounding difference."""
+
+    def test_annuity_schedule(self):
+        schedule = amortize(100000, Decimal("12"), 3, date(2024, 1, 31))
+        self.assertEqual(
+            list(schedule.dates),
+            [np.datetime64(day) for day in ("2024-01-31", "2024-02-29", "2024-03-31")],
+        )
+        self.assertEqual(list(schedule.payment), [34002, 34002, 34003])
+        self.assertEqual(list(schedule.interest), [1000, 670, 337])
+        self.assertEqual(list(schedule.principal), [33002, 33332, 33666])
+        self.assertEqual(list(schedule.remaining), [66998, 33666, 0])
+
+    def test_interest_free_schedule(self):
+        schedule = amortize(100000, Decimal("0"), 3, date(2024, 1, 15))
+        self.assertEqual(list(schedule.payment), [33334, 33334, 33332])
+        self.assertEqual(list(schedule.interest), [0, 0, 0])
+        self.assertEqual(list(schedule.remaining), [66666, 33332, 0])
+
+    def test_fixed_payment_pays_off_early(self):
+        schedule = amortize(100000, Decimal("0"), 12, date(2024, 1, 15), payment=40000)
+        self.assertEqual(list(schedule.payment), [40000, 40000, 20000])
+        self.assertEqual(list(schedule.remaining), [60000, 20000, 0])
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Iterator, Tuple
+from user.models import MyUser
+from .models import Transaction, TransactionOccurrence
+from .fields import MAX_CENTS, cents, from_cents, to_cents
+from . import occurrences
+import numpy as np
+
+# Largest opening balance (in either direction) a timeline accepts. Half of the cents range is left for the deltas, so
+# the running balances cannot overflow.
+MAX_OPENING = from_cents(MAX_CENTS // 2)
+
+
+class BalanceTimeline:
+    """Running balance for every day of a date range. Built once from per-day deltas with a prefix sum, so the balance on
+    any day can be read in constant time afterwards."""
+
+    def __init__(self, start: date, deltas: np.ndarray, opening: Decimal = 0):
+        self.start = start
+        self.end = start + timedelta(days=len(deltas) - 1)
+        self.opening = opening
+        self.deltas = deltas
+        self.balances = to_cents(opening) + np.cumsum(deltas)
+
+    def __len__(self):
+        return len(self.balances)
+
+    def balance_on(self, day: date) -> Decimal:
+        """Takes a date inside the range as argument and returns the balance at the end of that day."""
+        index = (day - self.start).days
+        if not 0 <= index < len(self):
+            raise ValueError(f"{day} is outside of {self.start} - {self.end}.")
+        return from_cents(self.balances[index])
+
+    def lowest(self) -> Tuple[date, Decimal]:
+        """Return a tuple (day, balance) of the day with the lowest balance (the first one if there are several)."""
+        index = int(np.argmin(self.balances))
+        return self.start + timedelta(days=index), from_cents(self.balances[index])
+
+    def days(self) -> Iterator[Tuple[date, Decimal, Decimal]]:
+        """Yield a tuple (day, delta, balance) for every day of the range."""
+        for index in range(len(self)):
+            yield (
+                self.start + timedelta(days=index),
+                from_cents(self.deltas[index]),
+                from_cents(self.balances[index]),
+            )
+
+
+def day_deltas(user: MyUser, start: date, end: date) -> np.ndarray:
+    """Takes a user, start and end date as arguments and returns an array with the summed amount (in cents) of all
+    transactions due on each day in between (inclusive) for the ledger the user acts on.
+    """
+    deltas = np.zeros((end - start).days + 1, dtype=np.int64)
+    if occurrences.is_materialized(start, end):
+        rows = (
+            TransactionOccurrence.objects.owned_by(user)
+            .filter(date__range=(start, end))
+            .values_list("date", cents("amount"))
+        )
+        for due_date, amount in rows:
+            deltas[(due_date - start).days] += amount
+        return deltas
+
+    queryset = Transaction.objects.owned_by(user).active_between(start, end)
+    for transaction in queryset:
+        for due_date, amount in transaction.dated_amounts(start, end):
+            deltas[(due_date - start).days] += to_cents(amount)
+    return deltas
+
+
+def build_timeline(
+    user: MyUser, start: date, end: date, opening: Decimal = 0
+) -> BalanceTimeline:
+    """Takes a user, start and end date and an opening balance as arguments and returns the BalanceTimeline of the
+    ledger the user acts on."""
+    return BalanceTimeline(start, day_deltas(user, start, end), opening)
@@ -1,17 +1,31 @@
+from django.conf import settings
 from django.urls import path, reverse_lazy
 from django.views.generic import UpdateView, DeleteView
 from django.contrib.auth.decorators import login_required
 from .models import Transaction
+from .api import days_api, month_api, transactions_api
 from .views import (
     BalanceView,
+    ProjectionView,
+    TimelineView,
     TransactionDetailView,
     ExpenseListView,
     IncomeListView,
     LoanListView,
     create_transaction_view,
+    import_transactions_view,
+    export_view,
     select_group_view,
 )
 
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncBalanceView as BalanceView,
+        AsyncExpenseListView as ExpenseListView,
+        AsyncIncomeListView as IncomeListView,
+        AsyncLoanListView as LoanListView,
+    )
+
 
 urlpatterns = [
     path(
@@ -21,6 +35,26 @@ urlpatterns = [
     ),
     path("", BalanceView.as_view(
         template_name="balance/balance.html"), name="balance"),
+    path(
+        "projection",
+        ProjectionView.as_view(template_name="balance/projection.html"),
+        name="projection",
+    ),
+    path(
+        "projection/<int:monthyear>",
+        ProjectionView.as_view(template_name="balance/projection.html"),
+        name="projection",
+    ),
+    path(
+        "timeline",
+        TimelineView.as_view(template_name="balance/timeline.html"),
+        name="timeline",
+    ),
+    path(
+        "timeline/<int:monthyear>",
+        TimelineView.as_view(template_name="balance/timeline.html"),
+        name="timeline",
+    ),
     path(
         "expenses",
         ExpenseListView.as_view(template_name="balance/expenses.html"),
@@ -40,6 +74,21 @@ urlpatterns = [
         name="details",
     ),
     path("create", login_required(create_transaction_view), name="create"),
+    path("import", login_required(import_transactions_view), name="import"),
+    path("api/month", login_required(month_api), name="api_month"),
+    path("api/month/<int:monthyear>", login_required(month_api), name="api_month"),
+    path("api/days", login_required(days_api), name="api_days"),
+    path("api/days/<int:monthyear>", login_required(days_api), name="api_days"),
+    path(
+        "api/transactions/<str:kind>",
+        login_required(transactions_api),
+        name="api_transactions",
+    ),
+    path(
+        "export/<str:kind>.<str:file_format>",
+        login_required(export_view),
+        name="export",
+    ),
     path("group_select", login_required(select_group_view), name="group_select"),
     path(
         "<int:pk>/update",
@@ -58,6 +107,9 @@ urlpatterns = [
                     "email",
                     "telephone",
                     "end_date",
+                    "interest_rate",
+                    "term_months",
+                    "payment",
                 ],
                 success_url=reverse_lazy("balance"),
             )
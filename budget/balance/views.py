@@ -1,31 +1,71 @@
 from django.db.models.query import QuerySet
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
+from django.views.generic.base import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
-from .forms import CreateTransactionForm
+from .forms import CreateTransactionForm, ImportTransactionsForm
 from datetime import date
-from .models import Transaction
-from user.models import MyUser, UserGroup
+import io
+from decimal import Decimal
+from typing import Optional, Tuple
+from .models import Transaction, add_months, month_bounds
+from .fields import CENT
+from .conditional import ledger_cache, ledger_etag, ledger_last_modified
+from .pagination import SORT_KEYS, keyset_page
+from . import engine, exports, imports, summaries, timeline
+from user.models import MyUser
 
 month_str = str(date.today().month)
 year_str = str(date.today().year)
 month_year_int = int(month_str + year_str)
+# Years that can be displayed: four digits, as the month year integers of the urls require, leaving room for
+# projections far into the future before the end of the calendar.
+YEARS = range(1000, 9900)
 
 
-def find_queryset(user_id: int) -> QuerySet:
+def find_queryset(user: MyUser) -> QuerySet:
     """Determines if a user is acting as an individual or a group and returns queryset accordingly."""
-    active_user = MyUser.objects.get(id=user_id)
-    if active_user.as_group:
-        queryset = Transaction.objects.filter(group=active_user.get_active_group())
-    else:
-        queryset = Transaction.objects.filter(user=active_user, group__isnull=True)
+    queryset = Transaction.objects.owned_by(user)
     return queryset
 
 
+def split_month_year(month_year: int) -> Tuple[int, int]:
+    """Takes a month year integer as used in urls (e.g. 32024 or 112024) as argument and returns a tuple (month, year)."""
+    return int(str(month_year)[:-4]), int(str(month_year)[-4:])
+
+
+def month_year(monthyear: Optional[int]) -> Tuple[int, int]:
+    """Takes the month year integer of the url (or None) as argument and returns a tuple (month, year), the current
+    month if there is none. Raises Http404 if it is not a valid month."""
+    if monthyear is None:
+        return int(month_str), int(year_str)
+    try:
+        month, year = split_month_year(monthyear)
+    except ValueError:
+        raise Http404("Invalid month.")
+    if not 1 <= month <= 12 or year not in YEARS:
+        raise Http404("Invalid month.")
+    return month, year
+
+
+def balance_etag(request, monthyear=None) -> Optional[str]:
+    """Return the ETag of the balance page of a month, computed before any balance calculation."""
+    return ledger_etag(request, "balance", *month_year(monthyear))
+
+
+@method_decorator(ledger_cache, name="dispatch")
+@method_decorator(
+    condition(etag_func=balance_etag, last_modified_func=ledger_last_modified),
+    name="dispatch",
+)
 class BalanceView(LoginRequiredMixin, ListView):
-    """Class based view for Balance."""
+    """Class based view for Balance. Answers repeat visits with 304 as long as the ledger is unchanged."""
     
     @property
     def show_month(self):
@@ -101,80 +141,191 @@ class BalanceView(LoginRequiredMixin, ListView):
 
     def group_members(self):
         """Return group names of which requesting user is a member."""
-        if self.request.method == "GET":
-            groups = UserGroup.objects.filter(members=self.request.user.id)
-            group_names = [i.name for i in groups]
+        group_names = [i.name for i in self.request.groups]
         return group_names
 
     def get_queryset(self):
-        """Return queryset based on requesting user's id."""
-        queryset = find_queryset(self.request.user.id)
+        """Return queryset of transactions that can be due in the active month based on requesting user's id."""
+        start, end = month_bounds(self.show_month, self.show_year)
+        queryset = find_queryset(self.request.user).active_between(start, end)
         return queryset
 
     def month_amount(self):
-        """Calculate and return total amount for user for active month."""
-        month_amount = 0
-        queryset = self.get_queryset()
-        for i in queryset:
-            month_amount += i.active_month(month=self.show_month, year=self.show_year)
-        return month_amount
+        """Return total amount for user for active month from the stored monthly summary."""
+        summary = summaries.get_month_summary(
+            self.request.user, month=self.show_month, year=self.show_year
+        )
+        return summary.net
 
     def get_context_data(self, **kwargs):
         """Collect context data to be displayed in html."""
         context = super().get_context_data(**kwargs)
         context["month_amount"] = self.month_amount()
-        context["show_month"] = date(month=self.show_month, year=1, day=1).strftime(
-            "%B"
-        )
-        context["show_year"] = self.show_year
-        context["prev_month_year"] = self.prev_month_year
-        context["next_month_year"] = self.next_month_year
+        context.update(self.month_context())
         context["groups"] = self.group_members()
         return context
 
+    def month_context(self):
+        """Return context data of the displayed month and the links to the previous and next month."""
+        return {
+            "show_month": date(month=self.show_month, year=1, day=1).strftime("%B"),
+            "show_year": self.show_year,
+            "prev_month_year": self.prev_month_year,
+            "next_month_year": self.next_month_year,
+        }
+
+
+class ProjectionView(LoginRequiredMixin, ListView):
+    """Class based view for a multi-month cash-flow projection."""
+
+    max_months = 600
+
+    @property
+    def months(self):
+        """Return number of months to project, taken from the months query parameter (default 12)."""
+        try:
+            months = int(self.request.GET.get("months", 12))
+        except ValueError:
+            months = 12
+        return min(max(months, 1), self.max_months)
+
+    def get_queryset(self):
+        """Return queryset based on requesting user's id."""
+        queryset = find_queryset(self.request.user)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        """Collect context data to be displayed in html."""
+        context = super().get_context_data(**kwargs)
+        month, year = month_year(self.kwargs.get("monthyear"))
+
+        start = date(year, month, 1)
+        last = add_months(start, self.months - 1)
+        queryset = self.object_list.active_between(
+            start, month_bounds(last.month, last.year)[1]
+        )
+        projection = engine.project(queryset, month, year, self.months)
+        context["projection"] = projection
+        context["months"] = self.months
+        context["income"] = sum(row["income"] for row in projection)
+        context["expense"] = sum(row["expense"] for row in projection)
+        context["net"] = sum(row["net"] for row in projection)
+        return context
+
+
+class TimelineView(LoginRequiredMixin, TemplateView):
+    """Class based view for the daily running balance over one or more months."""
+
+    max_months = 24
+
+    @property
+    def months(self):
+        """Return number of months to show, taken from the months query parameter (default 1)."""
+        try:
+            months = int(self.request.GET.get("months", 1))
+        except ValueError:
+            months = 1
+        return min(max(months, 1), self.max_months)
+
+    @property
+    def opening(self):
+        """Return opening balance, taken from the opening query parameter (default 0). Values that are not finite or
+        larger than timeline.MAX_OPENING fall back to 0."""
+        try:
+            opening = Decimal(self.request.GET.get("opening", 0)).quantize(CENT)
+        except (ArithmeticError, ValueError):
+            return Decimal("0.00")
+        if not opening.is_finite() or abs(opening) > timeline.MAX_OPENING:
+            return Decimal("0.00")
+        return opening
+
+    def get_context_data(self, **kwargs):
+        """Collect context data to be displayed in html."""
+        context = super().get_context_data(**kwargs)
+        month, year = month_year(self.kwargs.get("monthyear"))
+
+        start = date(year, month, 1)
+        last = add_months(start, self.months - 1)
+        end = month_bounds(last.month, last.year)[1]
+        balance_timeline = timeline.build_timeline(
+            self.request.user, start, end, self.opening
+        )
+        context["days"] = list(balance_timeline.days())
+        context["lowest_day"], context["lowest_balance"] = balance_timeline.lowest()
+        context["closing"] = balance_timeline.balance_on(end)
+        context["opening"] = self.opening
+        context["months"] = self.months
+        return context
+
 
 class TransactionDetailView(LoginRequiredMixin, DetailView):
     """Class based view for Transaction Details."""
     
     def get_queryset(self):
         """Return queryset based on requesting user's id."""
-        queryset = find_queryset(self.request.user.id)
+        queryset = find_queryset(self.request.user)
         return queryset
 
     def get_context_data(self, **kwargs):
         """Collect context data to be displayed in html."""
         context = super().get_context_data(**kwargs)
-        transaction = self.get_object()
-        context["items_dict"] = transaction.dict().items()
+        context["items_dict"] = self.object.dict().items()
         return context
 
 
-class ExpenseListView(LoginRequiredMixin, ListView):
+class KeysetListMixin:
+    """Mixin for the transaction list views. Shows one keyset paginated page of the queryset, sorted by the sort query
+    parameter and loading only the columns the list templates display."""
+
+    page_size = 50
+    default_sort = "due_date"
+    list_fields = ("id", "purpose", "amount", "name", "due_date")
+
+    @property
+    def sort(self):
+        """Return sort option taken from the sort query parameter (default due date)."""
+        sort = self.request.GET.get("sort", self.default_sort)
+        return sort if sort in SORT_KEYS else self.default_sort
+
+    def get_context_data(self, **kwargs):
+        """Collect context data to be displayed in html."""
+        page = keyset_page(
+            self.object_list.only(*self.list_fields),
+            self.sort,
+            self.request.GET.get("cursor"),
+            self.page_size,
+        )
+        context = super().get_context_data(object_list=page.items, **kwargs)
+        context["page"] = page
+        return context
+
+
+class ExpenseListView(LoginRequiredMixin, KeysetListMixin, ListView):
     """Class based view for List of expenses."""
     
     def get_queryset(self):
         """Return queryset based on requesting user's id and type of transaction being Expense."""
-        queryset = find_queryset(self.request.user.id)
+        queryset = find_queryset(self.request.user)
         queryset = queryset.filter(transaction_type="Expense")
         return queryset
 
 
-class IncomeListView(LoginRequiredMixin, ListView):
+class IncomeListView(LoginRequiredMixin, KeysetListMixin, ListView):
     """Class based view for List of Incomes."""
     
     def get_queryset(self):
         """Return queryset based on requesting user's id and type of transaction being Income."""
-        queryset = find_queryset(self.request.user.id)
+        queryset = find_queryset(self.request.user)
         queryset = queryset.filter(transaction_type="Income")
         return queryset
 
 
-class LoanListView(LoginRequiredMixin, ListView):
+class LoanListView(LoginRequiredMixin, KeysetListMixin, ListView):
     """Class based view for List of Loans."""
     
     def get_queryset(self):
         """Return queryset based on requesting user's id and type of transaction being Loan."""
-        queryset = find_queryset(self.request.user.id)
+        queryset = find_queryset(self.request.user)
         queryset = queryset.filter(transaction_type="Loan")
         return queryset
 
@@ -187,8 +338,7 @@ def create_transaction_view(request):
         if form.is_valid():
             newtrans = form.save(commit=False)
             newtrans.user = request.user
-            if request.user.as_group:
-                newtrans.group = UserGroup.objects.get(name=request.user.group)
+            newtrans.group = request.user.get_active_group()
             newtrans.save()
             form.save_m2m()
             return redirect("balance")
@@ -197,24 +347,84 @@ def create_transaction_view(request):
     return render(request, "balance/create.html", {"form": form})
 
 
+def import_transactions_view(request):
+    """Functional view for importing a bank statement. If request method is Post: import the uploaded CSV or OFX file
+    batch by batch into the ledger the user acts on and display a report for every batch. Else: display form."""
+    reports = []
+    if request.method == "POST":
+        form = ImportTransactionsForm(request.POST, request.FILES)
+
+        if form.is_valid():
+            statement = form.cleaned_data["statement"]
+            file_format = form.cleaned_data["file_format"] or imports.format_of(
+                statement.name
+            )
+            stream = io.TextIOWrapper(
+                statement, encoding="utf-8-sig", errors="replace", newline=""
+            )
+            try:
+                for report in imports.import_transactions(
+                    stream, file_format, request.user
+                ):
+                    reports.append(report)
+            except imports.StatementError as error:
+                form.add_error("statement", str(error))
+    else:
+        form = ImportTransactionsForm()
+    return render(
+        request,
+        "balance/import.html",
+        {
+            "form": form,
+            "reports": reports,
+            "created": sum(report.created for report in reports),
+            "error_count": sum(report.error_count for report in reports),
+        },
+    )
+
+
+def export_view(request, kind, file_format):
+    """Functional view for exporting the transactions or their occurrences between the start and end query parameters
+    (ISO dates, default the current year) as CSV or JSON. The file is streamed while it is read from the database."""
+    if kind not in exports.KINDS or file_format not in exports.FORMATS:
+        return HttpResponseBadRequest("Unknown export.")
+    try:
+        start = date.fromisoformat(request.GET.get("start", f"{year_str}-01-01"))
+        end = date.fromisoformat(request.GET.get("end", f"{year_str}-12-31"))
+    except ValueError:
+        return HttpResponseBadRequest("Start and end must be dates (YYYY-MM-DD).")
+    if end < start:
+        return HttpResponseBadRequest("End must not be before start.")
+
+    response = StreamingHttpResponse(
+        exports.export(kind, file_format, request.user, start, end),
+        content_type=exports.CONTENT_TYPES[file_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{kind}-{start}-{end}.{file_format}"'
+    )
+    return response
+
+
 def select_group_view(request):
     """Functional view for selecting a group. Gets groups of which user is a member and passes their names as context to be displayed in html. If user selects a group, activate selected group for user.
     if user selects switching to individual account, deactivate group for user."""
-    groups = UserGroup.objects.filter(members=request.user.id)
-    group_names = [i.name for i in groups]
+    groups = {str(group.id): group for group in request.groups}
     if request.method == "POST":
-        if request.POST.get("groups") in group_names:
-            request.user.set_active_group(request.POST.get("groups"))
-            request.user.save()
+        if request.POST.get("groups") in groups:
+            request.user.set_active_group(groups[request.POST.get("groups")])
+            request.user.ledger_modified = timezone.now()
+            request.user.save(update_fields=["group", "as_group", "ledger_modified"])
 
             return redirect("balance")
         elif request.POST.get("switch") == "Switch to individual account":
             request.user.as_group = False
             request.user.group = None
-            request.user.save()
+            request.user.ledger_modified = timezone.now()
+            request.user.save(update_fields=["group", "as_group", "ledger_modified"])
 
             return redirect("welcome")
     else:
-        groups = UserGroup.objects.filter(members=request.user.id)
-        group_names = [i.name for i in groups]
-        return render(request, "balance/group_select.html", {"groups": group_names})
+        return render(
+            request, "balance/group_select.html", {"groups": groups.values()}
+        )
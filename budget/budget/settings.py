@@ -38,6 +38,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "user.middleware.LedgerOwnerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -74,6 +75,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Use a shared backend (e.g. Memcached or Redis) when running more than one process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "budget",
+    }
+}
+
+# Seconds a rendered welcome calendar stays cached. Entries are keyed by the owner's ledger version, so writes never serve stale calendars.
+CALENDAR_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serve the balance, welcome and list pages with async views. Only pays off under an ASGI server (see budget/asgi.py).
+ASYNC_VIEWS = False
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -120,3 +139,18 @@ LOGIN_REDIRECT_URL = "welcome"
 LOGOUT_REDIRECT_URL = "home"
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 AUTH_USER_MODEL = "user.MyUser"
+# New logins use ActiveGroupBackend. ModelBackend stays listed so sessions created before it keep working, they switch
+# on their next login.
+AUTHENTICATION_BACKENDS = [
+    "user.backends.ActiveGroupBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+# Rolling horizon (in months around the current month) over which transaction occurrences are materialized.
+# Run "python manage.py rebuild_occurrences" once and "python manage.py extend_occurrences" daily.
+OCCURRENCE_HORIZON_MONTHS_BACK = 12
+OCCURRENCE_HORIZON_MONTHS_AHEAD = 36
+
+# Leave the occurrences and summaries of written transactions to the recompute_worker command instead of updating them
+# in the write request. Only enable it with a worker running.
+RECOMPUTE_IN_BACKGROUND = False
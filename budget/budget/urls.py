@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.decorators import login_required
 from django.urls import path, include
@@ -11,26 +12,30 @@ from home.views import (
 )
 from balance.models import Transaction
 
+if settings.ASYNC_VIEWS:
+    # The async view checks the login itself, login_required only wraps sync views in this Django version.
+    from home.async_views import AsyncWelcomeView
+
+    welcome_view = AsyncWelcomeView.as_view()
+else:
+    welcome_view = login_required(
+        WelcomeView.as_view(
+            queryset=Transaction.objects.all(), template_name="home/welcome.html"
+        )
+    )
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("django.contrib.auth.urls")),
     path("", TemplateView.as_view(template_name="home/home.html"), name="home"),
     path(
         "welcome",
-        login_required(
-            WelcomeView.as_view(
-                queryset=Transaction.objects.all(), template_name="home/welcome.html"
-            )
-        ),
+        welcome_view,
         name="welcome",
     ),
     path(
         "welcome/<int:monthyear>",
-        login_required(
-            WelcomeView.as_view(
-                queryset=Transaction.objects.all(), template_name="home/welcome.html"
-            )
-        ),
+        welcome_view,
         name="welcome",
     ),
     path("registration/register", registration, name="sign_up"),
@@ -0,0 +1,28 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+from balance.async_views import AsyncLedgerView
+from balance.models import Transaction
+from .views import WelcomeView, welcome_etag
+
+
+class AsyncWelcomeView(AsyncLedgerView):
+    """Async class based view for Welcome page. Reads the cached calendar without blocking the event loop and builds it
+    in a worker thread on a cache miss."""
+
+    template_name = "home/welcome.html"
+
+    def get_etag(self, request, *args, **kwargs):
+        return welcome_etag(request, *args, **kwargs)
+
+    async def get_context_data(self, request, *args, **kwargs):
+        """Collect context data to be displayed in html."""
+        view = WelcomeView(queryset=Transaction.objects.all())
+        view.setup(request, *args, **kwargs)
+        body = await cache.aget(view.calendar_key())
+        if body is None:
+            # Expanding the repeat patterns and rendering the weeks is CPU heavy, so it runs off the event loop.
+            body = await sync_to_async(view.render_calendar)()
+        context = {"calendar_body": mark_safe(body)}
+        context.update(view.month_context())
+        return context
@@ -0,0 +1,32 @@
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+import calendar
+
+
+class MonthLayout(NamedTuple):
+    """Grid of a calendar month with weeks starting on Monday. leading_days are the days of the previous month shown
+    before the 1st, trailing_days the days of the next month shown after the last day.
+    """
+
+    leading_days: Tuple[int, ...]
+    weeks: Tuple[Tuple[int, ...], ...]
+    trailing_days: Tuple[int, ...]
+    num_days: int
+
+
+@lru_cache(maxsize=256)
+def month_layout(year: int, month: int) -> MonthLayout:
+    """Takes year and month as arguments and returns the MonthLayout of that month. Cached, as it never changes."""
+    first_weekday, num_days = calendar.monthrange(year, month)
+    prev_year, prev_month = (year, month - 1) if month != 1 else (year - 1, 12)
+    prev_num_days = calendar.monthrange(prev_year, prev_month)[1]
+
+    leading_days = tuple(range(prev_num_days - first_weekday + 1, prev_num_days + 1))
+    first_week_length = 7 - first_weekday
+    weeks = [tuple(range(1, first_week_length + 1))]
+    weeks.extend(
+        tuple(range(day, min(day + 7, num_days + 1)))
+        for day in range(first_week_length + 1, num_days + 1, 7)
+    )
+    trailing_days = tuple(range(1, 7 - len(weeks[-1]) + 1))
+    return MonthLayout(leading_days, tuple(weeks), trailing_days, num_days)
@@ -1 +1,85 @@
+from datetime import date
+from decimal import Decimal
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from balance.models import Transaction
+from user.models import MyUser
+
+
+class WelcomeMonthTest(TestCase):
+    """The welcome calendar answers a month year integer that is not a valid month with 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("welcome", password="pw")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_invalid_months_are_not_found(self):
+        for monthyear in (0, 5, 2024, 132024, 120999):
+            with self.subTest(monthyear=monthyear):
+                response = self.client.get(reverse("welcome", args=[monthyear]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_valid_months_are_shown(self):
+        for monthyear in (12024, 122024):
+            with self.subTest(monthyear=monthyear):
+                response = self.client.get(reverse("welcome", args=[monthyear]))
+                self.assertEqual(response.status_code, 200)
+
+
+class CalendarCacheTest(TestCase):
+    """The rendered calendar is cached under the ledger version, so every write switches to a new cache key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("calendar", password="pw")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def key(self):
+        """Return the cache key of the January 2024 calendar of the user's current ledger version."""
+        self.user.refresh_from_db()
+        return (
+            f"welcome-calendar:myuser:{self.user.pk}:{self.user.ledger_version}:2024:1"
+        )
+
+    def calendar(self):
+        """Request the January 2024 welcome page and return the cached calendar body of the current version."""
+        self.assertEqual(
+            self.client.get(reverse("welcome", args=[12024])).status_code, 200
+        )
+        return cache.get(self.key())
+
+    def test_writes_change_the_cache_key(self):
+        empty = self.calendar()
+        self.assertNotIn("income", empty)
+        keys = [self.key()]
+
+        transaction = Transaction.objects.create(
+            user=self.user,
+            transaction_type="Income",
+            name="Salary",
+            purpose="test",
+            amount=Decimal("100.00"),
+            due_date=date(2024, 1, 15),
+        )
+        self.assertIsNone(cache.get(self.key()))
+        self.assertIn("100.00", self.calendar())
+        keys.append(self.key())
+
+        transaction.amount = Decimal("80.00")
+        transaction.save()
+        self.assertIsNone(cache.get(self.key()))
+        self.assertIn("80.00", self.calendar())
+        keys.append(self.key())
+
+        transaction.delete()
+        self.assertIsNone(cache.get(self.key()))
+        self.assertEqual(self.calendar(), empty)
+        keys.append(self.key())
+        self.assertEqual(len(set(keys)), 4)
@@ -1,38 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.decorators import method_decorator
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
 from django.views.generic.list import ListView
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.hashers import make_password, check_password
-from balance.models import Transaction
+from balance.models import Transaction, TransactionOccurrence, month_bounds
+from balance import occurrences, summaries
+from balance.fields import from_cents
+from balance.conditional import ledger_cache, ledger_etag, ledger_last_modified
+from balance.views import month_year
+from .layout import month_layout
 from user.models import MyUser, UserGroup
 from user.forms import RegistrationForm, GroupRegistrationForm
 from datetime import date
-import calendar
-
 
 month_str = str(date.today().month)
 year_str = str(date.today().year)
 month_year_int = int(month_str + year_str)
 
 
-class WelcomeView(LoginRequiredMixin, ListView):
-    """Class based view for Welcome page."""
-    
-    @property
-    def show_month(self):
-        """Update and return show month property representing currently displayed month."""
-        try:
-            month_year = self.kwargs["monthyear"]
+def welcome_etag(request, monthyear=None):
+    """Return the ETag of the welcome page of a month, computed before the calendar is built."""
+    return ledger_etag(request, "welcome", *month_year(monthyear))
 
-            if len(str(month_year)) == 6:
-                show_month = int(str(month_year)[:2])
-            else:
-                show_month = int(str(month_year)[:1])
 
-        except KeyError:
-            show_month = int(month_str)
+@method_decorator(ledger_cache, name="dispatch")
+@method_decorator(
+    condition(etag_func=welcome_etag, last_modified_func=ledger_last_modified),
+    name="dispatch",
+)
+class WelcomeView(LoginRequiredMixin, ListView):
+    """Class based view for Welcome page. Answers repeat visits with 304 as long as the ledger is unchanged."""
+
+    def setup(self, request, *args, **kwargs):
+        """Parse the displayed month and year from the url once per request."""
+        super().setup(request, *args, **kwargs)
+        self._show_month, self._show_year = month_year(self.kwargs.get("monthyear"))
 
-        self._show_month = show_month
+    @property
+    def show_month(self):
+        """Return show month property representing currently displayed month."""
         return self._show_month
 
     @show_month.setter
@@ -42,13 +54,7 @@ class WelcomeView(LoginRequiredMixin, ListView):
 
     @property
     def show_year(self):
-        """Update and return show year property representing currently displayed month."""
-        try:
-            month_year = self.kwargs["monthyear"]
-            self._show_year = int(str(month_year)[-4:])
-        except KeyError:
-            self._show_year = int(year_str)
-
+        """Return show year property representing currently displayed year."""
         return self._show_year
 
     @show_year.setter
@@ -87,115 +93,117 @@ class WelcomeView(LoginRequiredMixin, ListView):
         self._next_month_year = value
 
     def get_queryset(self):
-        """Return queryset based on requesting user's id and if that user is currently treated as a group member or individual."""
-        active_user = MyUser.objects.get(id=self.request.user.id)
-        if active_user.as_group:
-            queryset = Transaction.objects.filter(group=active_user.get_active_group())
-        else:
-            queryset = Transaction.objects.filter(user=active_user, group__isnull=True)
+        """Return queryset of transactions that can be due in the active month based on requesting user's id and if that user is currently treated as a group member or individual."""
+        start, end = month_bounds(self.show_month, self.show_year)
+        queryset = Transaction.objects.owned_by(self.request.user).active_between(
+            start, end
+        )
         return queryset
 
+    def day_amounts(self):
+        """Return an iterable of tuples (day, amount) for all transactions due in the active month. Reads the
+        precomputed day amounts of the monthly summary if there are any, the materialized occurrences if they cover
+        the month and expands the repeat patterns otherwise."""
+        month, year = self.show_month, self.show_year
+        days = summaries.stored_days(self.request.user, month, year)
+        if days is not None:
+            return (
+                (day, from_cents(amount))
+                for day, amounts in enumerate(days, 1)
+                for amount in amounts
+            )
+        start, end = month_bounds(month, year)
+        if occurrences.is_materialized(start, end):
+            rows = (
+                TransactionOccurrence.objects.owned_by(self.request.user)
+                .filter(date__range=(start, end))
+                .order_by("date", "transaction_id")
+                .values_list("date", "amount")
+            )
+            return ((due_date.day, amount) for due_date, amount in rows)
+
+        return (
+            item
+            for transaction in self.get_queryset().order_by("id")
+            for item in transaction.day_balance(month, year).items()
+        )
+
     def dayly_transactions(self):
         """Return a list of days for the calendar view, where every day is represented as a tuple (day, None/list of transactions)."""
+        num_days = month_layout(self.show_year, self.show_month).num_days
+        buckets = [None] * (num_days + 1)
+        for day, amount in self.day_amounts():
+            if buckets[day] is None:
+                buckets[day] = [amount]
+            else:
+                buckets[day].append(amount)
 
-        dayly_transactions_dict = dict()
-        for transaction in self.get_queryset():
-            for key, value in transaction.day_balance(
-                self.show_month, self.show_year
-            ).items():
-                if key not in dayly_transactions_dict:
-                    dayly_transactions_dict[key] = [value]
-                else:
-                    dayly_transactions_dict[key].append(value)
-
-        transaction_tuples = [
-            (i, None)
-            if i not in dayly_transactions_dict
-            else (i, dayly_transactions_dict.get(i))
-            for i in range(
-                1, calendar.monthrange(self.show_year, self.show_month)[1] + 1
-            )
-        ]
-        return transaction_tuples
+        return [(day, buckets[day]) for day in range(1, num_days + 1)]
 
     def weeks(self):
         """Return the list of tuples from dayly_transactions method split into weeks according to the active month.
-        Also return a list of first and last days of next/previous month to eventually style differently."""
-
+        Also return a list of first and last days of next/previous month to eventually style differently.
+        """
+        layout = month_layout(self.show_year, self.show_month)
         transaction_tuples = self.dayly_transactions()
-        prev_month_num_days = calendar.monthrange(
-            self.prev_month_year[1], self.prev_month_year[0]
-        )[1]
-        curr_month_weekday, curr_month_num_days = calendar.monthrange(
-            self.show_year, self.show_month
+        weeks = [[transaction_tuples[day - 1] for day in week] for week in layout.weeks]
+
+        last_days = list(layout.leading_days)
+        first_days = list(layout.trailing_days) or None
+        return (last_days, weeks[:-1], first_days, weeks[-1])
+
+    def calendar_key(self):
+        """Return the cache key of the calendar body. It contains the owner's ledger version, which is incremented
+        whenever one of the owner's transactions is written."""
+        owner = self.request.owner
+        return "welcome-calendar:{}:{}:{}:{}:{}".format(
+            owner._meta.model_name,
+            owner.pk,
+            owner.ledger_version,
+            self.show_year,
+            self.show_month,
         )
-        last_days = [
-            prev_month_num_days - i for i in range(curr_month_weekday - 1, -1, -1)
-        ]
-
-        first_week = [transaction_tuples[i] for i in range(7 - len(last_days))]
-
-        second_week = [
-            transaction_tuples[i] for i in range(first_week[-1][0], 14 - len(last_days))
-        ]
-
-        third_week = [
-            transaction_tuples[i]
-            for i in range(second_week[-1][0], 21 - len(last_days))
-        ]
-
-        fourth_week = [
-            transaction_tuples[i] for i in range(third_week[-1][0], 28 - len(last_days))
-        ]
-
-        weeks = [first_week, second_week, third_week, fourth_week]
 
-        if fourth_week[-1][0] == curr_month_num_days:
-            fifth_week = None
-            sixth_week = None
-
-        else:
-            fifth_week = [
-                transaction_tuples[i]
-                for i in range(fourth_week[-1][0], len(transaction_tuples))
-            ]
-            weeks.append(fifth_week)
-
-        if len(fifth_week) <= 7:
-            first_days = [i for i in range(1, 7) if len(fifth_week) + i <= 7]
-            if len(first_days) == 0:
-                first_days = None
-            sixth_week = None
-        else:
-            sixth_week = [
-                transaction_tuples[i]
-                for i in range(fifth_week[-1][0], 35 - len(last_days))
-            ]
-            weeks.append(sixth_week)
-            first_days = [i for i in range(1, 7) if len(sixth_week) + i <= 7]
+    def render_calendar(self):
+        """Render the calendar body, store it in the cache and return it."""
+        last_days, weeks, first_days, last_week = self.weeks()
+        body = render_to_string(
+            "home/calendar_body.html",
+            {
+                "last_days": last_days,
+                "weeks": weeks,
+                "last_week": last_week,
+                "first_days": first_days,
+            },
+        )
+        cache.set(self.calendar_key(), body, settings.CALENDAR_CACHE_TIMEOUT)
+        return body
 
-        last_week = weeks[-1]
-        weeks = weeks[:-1]
-        return (last_days, weeks, first_days, last_week)
+    def calendar_body(self):
+        """Return the rendered calendar body, cached per ledger owner and month."""
+        body = cache.get(self.calendar_key())
+        if body is None:
+            body = self.render_calendar()
+        return mark_safe(body)
 
     def get_context_data(self, **kwargs):
         """Collect context data to be displayed in html."""
         context = super().get_context_data(**kwargs)
-        last_days, weeks, first_days, last_week = self.weeks()
-        context["last_days"] = last_days
-        context["weeks"] = weeks
-        context["last_week"] = last_week
-        context["first_days"] = first_days
+        context["calendar_body"] = self.calendar_body()
+        context.update(self.month_context())
+        return context
 
+    def month_context(self):
+        """Return context data of the displayed month and the links to the previous and next month."""
         show_date = date(year=self.show_year, month=self.show_month, day=1)
-        context["month"] = show_date.strftime("%B")
-        context["year"] = show_date.year
-
         prev_month = int(str(self.prev_month_year[0]) + str(self.prev_month_year[1]))
         next_month = int(str(self.next_month_year[0]) + str(self.next_month_year[1]))
-        context["prev_month"] = prev_month
-        context["next_month"] = next_month
-        return context
+        return {
+            "month": show_date.strftime("%B"),
+            "year": show_date.year,
+            "prev_month": prev_month,
+            "next_month": next_month,
+        }
 
 
 def registration(request):
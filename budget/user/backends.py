@@ -0,0 +1,14 @@
+from django.contrib.auth.backends import ModelBackend
+from .models import MyUser
+
+
+class ActiveGroupBackend(ModelBackend):
+    """Authentication backend loading the active group of the requesting user in the same query as the user."""
+
+    def get_user(self, user_id):
+        """Takes a user id as argument and returns the user with the active group joined, or None."""
+        try:
+            user = MyUser._default_manager.select_related("group").get(pk=user_id)
+        except MyUser.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,29 @@
+from django.utils.functional import SimpleLazyObject
+
+
+class LedgerOwnerMiddleware:
+    """Middleware attaching the ledger owner (request.owner) and the groups of the requesting user (request.groups)
+    to every request. Both are resolved lazily and at most once per request, views share them instead of querying.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.owner = SimpleLazyObject(lambda: get_owner(request.user))
+        request.groups = SimpleLazyObject(lambda: get_groups(request.user))
+        return self.get_response(request)
+
+
+def get_owner(user):
+    """Takes a user as argument and returns the owner of the ledger the user acts on, None for anonymous users."""
+    if not user.is_authenticated:
+        return None
+    return user.get_ledger_owner()
+
+
+def get_groups(user):
+    """Takes a user as argument and returns the list of groups of which the user is a member."""
+    if not user.is_authenticated:
+        return []
+    return user.get_groups()
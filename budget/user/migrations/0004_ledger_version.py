@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_alter_myuser_as_group"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="myuser",
+            name="ledger_modified",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="myuser",
+            name="ledger_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="usergroup",
+            name="ledger_modified",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="usergroup",
+            name="ledger_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2 on 2026-10-18 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def names_to_groups(apps, schema_editor):
+    """Point every user's active group foreign key at the group named in the old group column."""
+    MyUser = apps.get_model("user", "MyUser")
+    UserGroup = apps.get_model("user", "UserGroup")
+    groups = dict(UserGroup.objects.values_list("name", "id"))
+    for user in MyUser.objects.exclude(group__isnull=True).exclude(group=""):
+        user.active_group_id = groups.get(user.group)
+        if user.active_group_id is None:
+            user.as_group = False
+        user.save(update_fields=["active_group", "as_group"])
+
+
+def groups_to_names(apps, schema_editor):
+    """Write the name of every user's active group back into the old group column."""
+    MyUser = apps.get_model("user", "MyUser")
+    for user in MyUser.objects.exclude(active_group__isnull=True).select_related(
+        "active_group"
+    ):
+        user.group = user.active_group.name
+        user.save(update_fields=["group"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0004_ledger_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="myuser",
+            name="active_group",
+            field=models.ForeignKey(
+                blank=True,
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="active_users",
+                to="user.usergroup",
+            ),
+        ),
+        migrations.RunPython(names_to_groups, groups_to_names),
+        migrations.RemoveField(
+            model_name="myuser",
+            name="group",
+        ),
+        migrations.RenameField(
+            model_name="myuser",
+            old_name="active_group",
+            new_name="group",
+        ),
+    ]
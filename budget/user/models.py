@@ -1,5 +1,18 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+
+def bump_ledger_version(user_id, group_id=None):
+    """Takes the owner fields of a transaction as arguments and increments the ledger version of that group or user."""
+    owners = (
+        UserGroup.objects.filter(id=group_id)
+        if group_id is not None
+        else MyUser.objects.filter(id=user_id)
+    )
+    owners.update(
+        ledger_version=models.F("ledger_version") + 1, ledger_modified=timezone.now()
+    )
 
 
 class MyUser(AbstractUser):
@@ -8,23 +21,38 @@ class MyUser(AbstractUser):
         default=False,
     )
 
-    group = models.CharField(max_length=50, null=True,
-                             default=None, blank=True)
+    group = models.ForeignKey(
+        "UserGroup",
+        on_delete=models.SET_NULL,
+        null=True,
+        default=None,
+        blank=True,
+        related_name="active_users",
+    )
+
+    ledger_version = models.PositiveIntegerField(default=0, editable=False)
+
+    ledger_modified = models.DateTimeField(null=True, blank=True, editable=False)
 
     def get_groups(self):
-        """Return list of group objects of which user is a member."""
-        groups = UserGroup.objects.filter(members=self.id)
-        return groups
+        """Return list of group objects of which user is a member. Loaded once per user instance."""
+        if not hasattr(self, "_groups"):
+            self._groups = list(UserGroup.objects.filter(members=self.id))
+        return self._groups
 
     def set_active_group(self, group):
         """Set user to act as a group member."""
-        if group in [group.name for group in self.get_groups()]:
+        if group.id in [group.id for group in self.get_groups()]:
             self.group = group
             self.as_group = True
 
     def get_active_group(self):
-        """If user acts as a group member, return the active group."""
-        return UserGroup.objects.get(name=self.group)
+        """If user acts as a group member, return the active group, None otherwise."""
+        return self.group if self.as_group else None
+
+    def get_ledger_owner(self):
+        """Return the owner of the ledger the user currently acts on: the active group or the user itself."""
+        return self.get_active_group() or self
 
 
 class UserGroup(models.Model):
@@ -37,4 +65,10 @@ class UserGroup(models.Model):
 
     password = models.CharField(max_length=35)
 
+    ledger_version = models.PositiveIntegerField(default=0, editable=False)
+
+    ledger_modified = models.DateTimeField(null=True, blank=True, editable=False)
 
+    def __str__(self):
+        """Return the name of the group."""
+        return self.name
@@ -1 +1,29 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
 from django.test import TestCase
+from django.urls import reverse
+from .models import MyUser
+
+
+class AuthenticationBackendTest(TestCase):
+    """Logins use ActiveGroupBackend, sessions stored by ModelBackend stay logged in."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = MyUser.objects.create_user("backend", password="pw")
+
+    def test_login_uses_active_group_backend(self):
+        self.assertTrue(self.client.login(username="backend", password="pw"))
+        self.assertEqual(
+            self.client.session[BACKEND_SESSION_KEY],
+            "user.backends.ActiveGroupBackend",
+        )
+        self.assertEqual(self.client.get(reverse("balance")).status_code, 200)
+
+    def test_model_backend_session_stays_logged_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        self.assertEqual(self.client.get(reverse("balance")).status_code, 200)
+
+    def test_wrong_password_is_rejected(self):
+        self.assertFalse(self.client.login(username="backend", password="wrong"))